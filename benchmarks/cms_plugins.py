@@ -0,0 +1,13 @@
+from cms.plugin_base import CMSPluginBase
+from cms.plugin_pool import plugin_pool
+from cmsplus.models import PlusItem
+
+
+@plugin_pool.register_plugin
+class BenchmarkPlusPlugin(CMSPluginBase):
+    """Minimal PlusItem plugin used by the synthetic trees.
+    """
+    model = PlusItem
+    name = 'Benchmark Plus Item'
+    render_template = 'benchmarks/plugin.html'
+    allow_children = True
@@ -0,0 +1,55 @@
+"""Compares two benchmark result files, e.g. of two commits.
+
+    python -m benchmarks.compare base.json new.json --threshold 0.1
+
+Exits with status 1 if a phase got slower, issued more queries or needed more memory than the threshold allows.
+"""
+import argparse
+import json
+import sys
+
+METRICS = ('wall_time', 'queries', 'peak_memory')
+
+
+def compare(base: dict, new: dict, threshold: float) -> list[str]:
+    """prints the per phase deltas and returns the regressions.
+    """
+    if base.get('spec') != new.get('spec'):
+        print('warning: results were created with different tree specs.')
+
+    regressions = []
+    for phase, new_values in new['phases'].items():
+        base_values = base['phases'].get(phase)
+        if not base_values:
+            continue
+        cols = []
+        for metric in METRICS:
+            old, cur = base_values[metric], new_values[metric]
+            change = (cur - old) / old if old else 0.0
+            cols.append(f'{metric} {old} -> {cur} ({change:+.1%})')
+            if change > threshold:
+                regressions.append(f'{phase}.{metric}')
+        print(f'{phase:<24} ' + ' | '.join(cols))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('base')
+    parser.add_argument('new')
+    parser.add_argument('--threshold', type=float, default=0.1, help='allowed relative increase, default 0.1')
+    args = parser.parse_args(argv)
+
+    with open(args.base) as f:
+        base = json.load(f)
+    with open(args.new) as f:
+        new = json.load(f)
+
+    regressions = compare(base, new, args.threshold)
+    if regressions:
+        print('regressions: ' + ', '.join(regressions))
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
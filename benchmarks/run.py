@@ -0,0 +1,141 @@
+"""Runs the transfer phases against a synthetic page tree and writes the measurements as json.
+
+    python -m benchmarks.run --pages 200 --languages 3 --output bench_results.json
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager
+from dataclasses import fields
+from functools import partial
+
+
+def parse_args(argv=None):
+    from .treegen import TreeSpec
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    for f in fields(TreeSpec):
+        parser.add_argument(f'--{f.name.replace("_", "-")}', type=type(f.default), default=f.default)
+    parser.add_argument('--no-trace-memory', dest='trace_memory', action='store_false',
+                        help='skip tracemalloc, which slows down the measured phases considerably.')
+    parser.add_argument('--output', default='bench_results.json', help='json result file, "-" for stdout.')
+    return parser.parse_args(argv)
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.check_output(['git', 'rev-parse', 'HEAD'], stderr=subprocess.DEVNULL, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ''
+
+
+@contextmanager
+def measure_phase(phase: str, results: dict, trace_memory=True):
+    """records wall time, query count/time and peak traced memory of the wrapped block in results[phase].
+    """
+    from django.db import connection
+    from cmstransfer.instrumentation import QueryCounter
+
+    if trace_memory:
+        tracemalloc.start()
+        tracemalloc.reset_peak()
+    stats = {}
+    counter = QueryCounter()
+    try:
+        with connection.execute_wrapper(counter):
+            start = time.perf_counter()
+            yield stats
+            wall_time = time.perf_counter() - start
+    finally:
+        peak = tracemalloc.get_traced_memory()[1] if trace_memory else 0
+        tracemalloc.stop()
+
+    results[phase] = {
+        'wall_time': round(wall_time, 6),
+        'queries': counter.count,
+        'query_time': round(counter.time, 6),
+        'peak_memory': peak,
+        **stats,
+    }
+
+
+def run(spec, trace_memory=True) -> dict:
+    from cms.models import Page
+    from django.contrib.auth import get_user_model
+    from django.core.management import call_command
+
+    from cmstransfer.exporters import PageExporter
+    from cmstransfer.importers import PageImporter
+    from cmstransfer.items import PageItem
+    from cmstransfer.serializers import JsonEncoder
+    from .treegen import TreeGenerator
+
+    call_command('migrate', verbosity=0)
+    user = get_user_model().objects.create_superuser('benchmark', 'benchmark@example.com', 'benchmark')
+    root = TreeGenerator(spec, user).generate()
+    target = Page.objects.get(reverse_id='error-404')
+
+    results = {}
+    measure = partial(measure_phase, trace_memory=trace_memory)
+    with measure('export', results) as stats:
+        item = PageExporter(root, recursive=True).export()
+        stats['pages'] = len(item.collect_pages())
+        stats['plugins'] = len(item.collect_plugins())
+
+    with measure('to_json', results) as stats:
+        data = json.loads(json.dumps(item.asdict(), cls=JsonEncoder))
+        stats['bytes'] = len(json.dumps(data))
+
+    with measure('from_dict', results):
+        item = PageItem.from_dict(data)
+
+    with measure('update_model_refs', results) as stats:
+        stats['errors'] = len(item.update_model_refs())
+
+    with measure('import', results):
+        PageImporter(item, user, parent=target).exec_import()
+
+    with measure('update_internal_links', results) as stats:
+        stats['errors'] = len(item.update_internal_links())
+
+    return results
+
+
+def main(argv=None):
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'benchmarks.settings')
+    import django
+    django.setup()
+
+    from .treegen import TreeSpec
+
+    args = parse_args(argv)
+    spec = TreeSpec(**{f.name: getattr(args, f.name) for f in fields(TreeSpec)})
+
+    report = {
+        'commit': git_commit(),
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'django': django.get_version(),
+        'spec': spec.asdict(),
+        'trace_memory': args.trace_memory,
+        'phases': run(spec, trace_memory=args.trace_memory),
+    }
+
+    output = json.dumps(report, indent=2)
+    if args.output == '-':
+        sys.stdout.write(output + '\n')
+    else:
+        with open(args.output, 'w') as f:
+            f.write(output + '\n')
+        for phase, values in report['phases'].items():
+            print(f"{phase:<24} {values['wall_time']:>10.3f}s {values['queries']:>8} queries "
+                  f"{values['peak_memory'] / 1024:>10.0f} KiB")
+
+
+if __name__ == '__main__':
+    main()
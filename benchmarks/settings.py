@@ -0,0 +1,76 @@
+"""Django settings for the benchmark suite: in-memory SQLite, no network.
+"""
+import os
+import tempfile
+
+SECRET_KEY = 'cmstransfer-benchmarks'
+DEBUG = False
+SITE_ID = 1
+USE_TZ = True
+ROOT_URLCONF = 'benchmarks.urls'
+DEFAULT_AUTO_FIELD = 'django.db.models.AutoField'
+
+INSTALLED_APPS = [
+    'django.contrib.auth',
+    'django.contrib.contenttypes',
+    'django.contrib.sessions',
+    'django.contrib.admin',
+    'django.contrib.messages',
+    'django.contrib.sites',
+    'cms',
+    'menus',
+    'treebeard',
+    'sekizai',
+    'parler',
+    'filer',
+    'easy_thumbnails',
+    'djangocms_text',
+    'djangocms_alias',
+    'cmsplus',
+    'cmstransfer',
+    'benchmarks',
+]
+
+DATABASES = {
+    'default': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': os.environ.get('BENCHMARK_DB', ':memory:'),
+    },
+}
+
+MIDDLEWARE = [
+    'django.contrib.sessions.middleware.SessionMiddleware',
+    'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'django.contrib.messages.middleware.MessageMiddleware',
+]
+
+TEMPLATES = [{
+    'BACKEND': 'django.template.backends.django.DjangoTemplates',
+    'DIRS': [],
+    'APP_DIRS': True,
+    'OPTIONS': {
+        'context_processors': [
+            'django.template.context_processors.request',
+            'django.contrib.auth.context_processors.auth',
+            'django.contrib.messages.context_processors.messages',
+            'sekizai.context_processors.sekizai',
+            'cms.context_processors.cms_settings',
+        ],
+    },
+}]
+
+LANGUAGE_CODE = 'de'
+LANGUAGES = [
+    ('de', 'Deutsch'),
+    ('en', 'English'),
+    ('fr', 'Français'),
+    ('it', 'Italiano'),
+    ('es', 'Español'),
+    ('nl', 'Nederlands'),
+]
+
+CMS_TEMPLATES = [('benchmarks/page.html', 'Benchmark Page')]
+CMS_CONFIRM_VERSION4 = True
+
+MEDIA_ROOT = tempfile.mkdtemp(prefix='cmstransfer-benchmarks-')
+MEDIA_URL = '/media/'
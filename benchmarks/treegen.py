@@ -0,0 +1,109 @@
+"""Synthetic CMS page tree generator for the benchmark suite.
+"""
+import random
+from dataclasses import dataclass, asdict
+
+from cms.api import create_page, create_page_content, add_plugin
+from cms.models import Page
+from django.conf import settings
+from django.core.files.base import ContentFile
+from filer.models import File
+
+
+@dataclass
+class TreeSpec:
+    pages: int = 50
+    children: int = 5             # max child pages per page (tree width)
+    languages: int = 2
+    placeholders: int = 2         # used slots per page content, max 8
+    plugins: int = 3              # root plugins per placeholder
+    plugin_depth: int = 2         # nesting levels below root plugins
+    plugin_children: int = 2      # children per nested PlusItem
+    plus_ratio: float = 0.7       # PlusItem vs Text plugins
+    filer_files: int = 20         # size of the filer file pool
+    filer_refs: int = 1           # filer references per PlusItem
+    internal_links: int = 1       # internal links per PlusItem
+    seed: int = 0
+
+    def asdict(self):
+        return asdict(self)
+
+
+class TreeGenerator:
+    """Builds a page tree in the database according to a TreeSpec.
+    """
+    TEMPLATE = 'benchmarks/page.html'
+
+    def __init__(self, spec: TreeSpec, user):
+        self.spec = spec
+        self.user = user
+        self.random = random.Random(spec.seed)
+        self.languages = [code for code, _ in settings.LANGUAGES][:spec.languages]
+        self.slots = [f'slot{idx}' for idx in range(spec.placeholders)]
+        self.files = []
+        self.pages = []
+
+    def generate(self) -> Page:
+        """creates the error-404 backup page, the filer file pool and the page tree. Returns the tree root.
+        """
+        create_page('Not found', self.TEMPLATE, self.languages[0], reverse_id='error-404', created_by=self.user)
+        self.files = [self.create_file(idx) for idx in range(self.spec.filer_files)]
+
+        root = self.create_page(0, parent=None)
+        level = [root]
+        while level and len(self.pages) < self.spec.pages:
+            next_level = []
+            for parent in level:
+                for _ in range(self.spec.children):
+                    if len(self.pages) >= self.spec.pages:
+                        break
+                    next_level.append(self.create_page(len(self.pages), parent=parent))
+            level = next_level
+
+        for page in self.pages:
+            self.fill_page(page)
+        return root
+
+    def create_file(self, idx: int) -> File:
+        content = ContentFile(f'benchmark file {idx}'.encode(), name=f'benchmark-{idx}.txt')
+        return File.objects.create(file=content, original_filename=content.name, owner=self.user)
+
+    def create_page(self, idx: int, parent: Page = None) -> Page:
+        page = create_page(
+            f'Page {idx}', self.TEMPLATE, self.languages[0], slug=f'page-{idx}', parent=parent,
+            in_navigation=True, created_by=self.user,
+        )
+        for language in self.languages[1:]:
+            create_page_content(
+                language, f'Page {idx} {language}', page, slug=f'page-{idx}-{language}', template=self.TEMPLATE,
+                created_by=self.user,
+            )
+        self.pages.append(page)
+        return page
+
+    def fill_page(self, page: Page):
+        for content in page.pagecontent_set.all():
+            placeholders = {p.slot: p for p in content.rescan_placeholders().values()}
+            for slot in self.slots:
+                for _ in range(self.spec.plugins):
+                    self.add_plugin(placeholders[slot], content.language, depth=0)
+
+    def add_plugin(self, placeholder, language: str, depth: int, parent=None):
+        if self.random.random() >= self.spec.plus_ratio:
+            add_plugin(placeholder, 'TextPlugin', language, target=parent, body=f'<p>{self.random.random()}</p>')
+            return
+
+        plugin = add_plugin(placeholder, 'BenchmarkPlusPlugin', language, target=parent, _json=self.plus_config())
+        if depth < self.spec.plugin_depth:
+            for _ in range(self.spec.plugin_children):
+                self.add_plugin(placeholder, language, depth + 1, parent=plugin)
+
+    def plus_config(self) -> dict:
+        config = {'title': f'item {self.random.random()}', 'attributes': {}}
+        for idx in range(self.spec.filer_refs if self.files else 0):
+            f = self.random.choice(self.files)
+            config[f'file_{idx}'] = {'model': 'filer.file', 'pk': f.pk, 'sha1': f.sha1, 'name': str(f)}
+        for idx in range(self.spec.internal_links if self.pages else 0):
+            page = self.random.choice(self.pages)
+            config[f'link_{idx}'] = {'internal_link': f'cms.page:{page.pk}'}
+        return config
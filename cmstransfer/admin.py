@@ -1,18 +1,156 @@
 import json
+import tempfile
+from contextlib import contextmanager
 
 from django import forms
+from django.conf import settings
 from django.contrib import admin, messages
-from django.utils.html import format_html
+from django.utils.html import format_html, format_html_join
 from django.utils.safestring import mark_safe
 from django.urls import path
 from django.shortcuts import redirect
+from django.http import FileResponse
 from django.core.exceptions import PermissionDenied
+from django.contrib.sites.models import Site
+from cms.models import Placeholder
 from cmsplus.fields import PageSearchField
 
-from .models import PageExport, PageImport, AliasExport, AliasImport
-from .exporters import PageExporter, AliasExporter
-from .importers import PageImporter, AliasImporter
-from .items import PageItem, AliasItem, TransferItem
+from .bundle import write_bundle, read_bundle
+from .digest import compare
+from .models import PageExport, PageImport, AliasExport, AliasImport, PlaceholderExport, PlaceholderImport
+from .exporters import PageExporter, AliasExporter, PlaceholderExporter
+from .importers import PageImporter, AliasImporter, PlaceholderImporter, PageStreamImporter, AliasStreamImporter
+from .instrumentation import TransferProfile, phase
+from .items import PageItem, AliasItem, PlaceholderItem, TransferItem
+from .ndjson import ITEM_TYPES, iter_units, open_lines, read_records, validate_records
+from .preflight import preflight_units
+
+import logging
+logger = logging.getLogger(__name__)
+
+
+# Profile Mixin
+# -------------
+class ProfileMixin:
+    @contextmanager
+    def profiled(self, obj, action: str):
+        """profiles the wrapped admin action and stores its phase stats in obj.stats[action], memory is traced only if
+        CONTENT_TRANSFER_PROFILE_MEMORY is set (tracemalloc slows down large transfers)
+        """
+        trace_memory = getattr(settings, 'CONTENT_TRANSFER_PROFILE_MEMORY', False)
+        # the total of the action, named apart from the phases of the same name (e.g. the exporter's 'export')
+        total = f'action:{action}'
+        with TransferProfile(trace_memory=trace_memory).activate() as profile:
+            with phase(total):
+                yield profile
+
+        obj.stats = {**(obj.stats or {}), action: profile.asdict()}
+        logger.info(f'{obj}: {action} stats: {obj.stats[action][total]}')
+
+    def stats_table(self, obj):
+        if not obj.stats:
+            return "-"
+        rows = format_html_join('', '<tr><td>{}</td><td>{}</td><td>{}</td><td>{}s</td><td>{}</td><td>{}s</td>'
+            '<td>{}</td><td>{}</td></tr>', (
+                (action, name, s['calls'], f"{s['wall_time']:.3f}", s['queries'], f"{s['query_time']:.3f}",
+                 f"{s['peak_memory'] // 1024} KiB" if s['peak_memory'] else '-',
+                 ', '.join(f'{k}: {v}' for k, v in s['objects'].items()))
+                for action, phases in obj.stats.items()
+                for name, s in phases.items()
+            )
+        )
+        return format_html(
+            '<table><tr><th>Action</th><th>Phase</th><th>Calls</th><th>Time</th><th>Queries</th><th>Query Time</th>'
+            '<th>Peak Memory</th><th>Objects</th></tr>{}</table>', rows
+        )
+    stats_table.short_description = "Stats"
+
+
+# Digest Mixin
+# ------------
+class DigestMixin:
+    actions = ['compare_digests']
+
+    @admin.action(description='Compare digests of 2 selected transfers')
+    def compare_digests(self, request, queryset):
+        objs = list(queryset.order_by('pk'))
+        if len(objs) != 2 or not all(obj.digest for obj in objs):
+            self.message_user(request, "Select 2 transfers with data to compare, payload imports have no digest.",
+                messages.WARNING)
+            return
+
+        a, b = objs
+        differences = compare(a.digest, b.digest)
+        if not differences:
+            self.message_user(request, f"{a} and {b} are equal.", messages.SUCCESS)
+            return
+        diff_html = format_html_join(mark_safe("<br>"), "• {} {}.", differences)
+        full_message = format_html("<strong>{} differs from {}:</strong><br>{}", a, b, diff_html)
+        self.message_user(request, full_message, messages.WARNING)
+
+
+# Bundle Mixins
+# -------------
+class BundleExportMixin:
+    def bundle_action(self, obj):
+        if not obj.pk:
+            return "Save first to enable download."
+        return format_html('<a class="button" href="{}">Download Bundle</a>', '../bundle/')
+    bundle_action.short_description = "Bundle (json with media files)"
+
+    def get_urls(self):
+        urls = super().get_urls()
+        custom_urls = [
+            path('<int:pk>/bundle/', self.admin_site.admin_view(self.bundle_view),
+                name=f'{self.item_cls.__name__.lower()}-bundle'),
+        ]
+        return custom_urls + urls
+
+    def bundle_view(self, request, pk):
+        if not request.user.is_superuser:
+            raise PermissionDenied  # the bundle contains all referenced filer files, private ones as well
+
+        obj = self.get_object(request, pk)
+        if obj is None:
+            raise PermissionDenied
+
+        fp = tempfile.TemporaryFile()
+        write_bundle(fp, self.item_cls.lazy(obj.data))
+        fp.seek(0)
+        return FileResponse(fp, as_attachment=True, filename=f'{obj._meta.model_name}-{obj.pk}.zip')
+
+
+class BundleImportForm(forms.ModelForm):
+    bundle = forms.FileField(
+        required=False,
+        help_text='Zip bundle (with media files) of an export, replaces data. Files which exist already (same sha1) '
+                  'are not written again.'
+    )
+
+
+# Payload Import Form
+# -------------------
+class PayloadImportForm(BundleImportForm):
+    """import form of transfers with an ndjson payload upload (PageImport, AliasImport)
+    """
+    def clean_payload(self):
+        """validates the uploaded ndjson payload record by record, it is streamed to the storage on save.
+        """
+        payload = self.cleaned_data.get('payload')
+        if not payload or not hasattr(payload, 'content_type'):
+            return payload  # no new upload
+
+        item_type = ITEM_TYPES[self._meta.model.item_cls]
+        lines = open_lines(payload.file)
+        try:
+            n = validate_records(lines, item_type)
+        except (ValueError, UnicodeDecodeError, OSError) as e:
+            raise forms.ValidationError(f'Invalid payload: {e}')
+        finally:
+            lines.detach()  # keeps the upload open
+            payload.seek(0)
+        logger.info(f'{payload.name}: {n} records validated')
+        return payload
 
 
 # PageExport Admin
@@ -23,35 +161,82 @@ class PageExportForm(forms.ModelForm):
         model = PageExport
         fields = '__all__'
 @admin.register(PageExport)
-class PageExportAdmin(admin.ModelAdmin):
+class PageExportAdmin(BundleExportMixin, ProfileMixin, DigestMixin, admin.ModelAdmin):
     form = PageExportForm
+    item_cls = PageItem
     list_display = ('page', 'modified_at')
+    readonly_fields = ('bundle_action', 'stats_table')
 
     def save_model(self, request, obj, form, change):
         # Export and save
-        exporter = PageExporter(obj.page, recursive=obj.recursive)
-        page_item = exporter.export()
-        obj.data = page_item.asdict()
+        with self.profiled(obj, 'export'):
+            exporter = PageExporter(obj.page, recursive=obj.recursive)
+            page_item = exporter.export()
+            obj.data = page_item.asdict()
         super().save_model(request, obj, form, change)
 
 
 # AliasExport Admin
 # -----------------
 @admin.register(AliasExport)
-class AliasExportAdmin(admin.ModelAdmin):
+class AliasExportAdmin(BundleExportMixin, ProfileMixin, DigestMixin, admin.ModelAdmin):
+    item_cls = AliasItem
     list_display = ('alias', 'modified_at')
+    readonly_fields = ('bundle_action', 'stats_table')
 
     def save_model(self, request, obj, form, change):
         # Export and save
-        exporter = AliasExporter(obj.alias)
-        alias_item = exporter.export()
-        obj.data = alias_item.asdict()
+        with self.profiled(obj, 'export'):
+            exporter = AliasExporter(obj.alias)
+            alias_item = exporter.export()
+            obj.data = alias_item.asdict()
+        super().save_model(request, obj, form, change)
+
+
+# PlaceholderExport Admin
+# -----------------------
+class PlaceholderIdField(forms.ModelChoiceField):
+    """placeholder by id, placeholders have no admin to select them from
+    """
+    widget = forms.NumberInput
+
+    def __init__(self, **kwargs):
+        super().__init__(Placeholder.objects.all(), required=False, **kwargs)
+
+
+class PlaceholderExportForm(forms.ModelForm):
+    placeholder = PlaceholderIdField(help_text=PlaceholderExport._meta.get_field('placeholder').help_text)
+    class Meta:
+        model = PlaceholderExport
+        fields = '__all__'
+@admin.register(PlaceholderExport)
+class PlaceholderExportAdmin(BundleExportMixin, ProfileMixin, DigestMixin, admin.ModelAdmin):
+    form = PlaceholderExportForm
+    item_cls = PlaceholderItem
+    list_display = ('placeholder', 'language', 'modified_at')
+    readonly_fields = ('bundle_action', 'stats_table')
+
+    def save_model(self, request, obj, form, change):
+        # Export and save
+        with self.profiled(obj, 'export'):
+            exporter = PlaceholderExporter(obj.placeholder, language=obj.language, user=request.user)
+            placeholder_item = exporter.export()
+            obj.data = placeholder_item.asdict()
         super().save_model(request, obj, form, change)
 
 
 # Import Mixin
 # ------------
-class ImportActionMixin:
+class ImportActionMixin(ProfileMixin):
+    def preflight_action(self, obj):
+        if not obj.pk:
+            return "Save first to enable preflight."
+        url = f'../preflight/'
+        return format_html(
+            '<a class="button" href="{}">Check %s Import Data</a>' % self.LABEL, url
+        )
+    preflight_action.short_description = "0. Preflight"
+
     def import_action(self, obj):
         if not obj.pk:
             return "Save first to enable import."
@@ -64,6 +249,8 @@ class ImportActionMixin:
     def update_action(self, obj):
         if not obj.pk:
             return "Save first to enable update."
+        if getattr(obj, 'payload', None):
+            return "Model refs of the payload are updated by the import."
         url = f'../update/'
         return format_html(
             '<a class="button" href="{}">Update Model Refs of %s Import Data</a>' % self.LABEL, url
@@ -73,15 +260,28 @@ class ImportActionMixin:
     def update_links_action(self, obj):
         if not obj.pk:
             return "Save first and Import to enable update links."
+        if getattr(obj, 'payload', None):
+            return "Internal links of the payload are updated by the import."
         url = f'../update-links/'
         return format_html(
             '<a class="button" href="{}">Update Internal Links in Plugins of %s Import Data</a>' % self.LABEL, url
         )
     update_links_action.short_description = "3. Update Links"
 
+    def save_model(self, request, obj, form, change):
+        bundle = form.cleaned_data.get('bundle')
+        if bundle:
+            with self.profiled(obj, 'bundle'):
+                obj.data, stats = read_bundle(bundle, request.user)
+            self.message_user(request, f"Bundle read: {stats['written']} files written, {stats['existing']} files "
+                "existed already.", messages.SUCCESS)
+        super().save_model(request, obj, form, change)
+
     def get_urls(self):
         urls = super().get_urls()
         custom_urls = [
+            path('<int:pk>/preflight/', self.admin_site.admin_view(self.preflight_view),
+                name=f'{self.LABEL.lower()}-preflight'),
             path('<int:pk>/update/', self.admin_site.admin_view(self.update_view), name=f'{self.LABEL.lower()}-update'),
             path('<int:pk>/import/', self.admin_site.admin_view(self.import_view), name=f'{self.LABEL.lower()}-import'),
             path('<int:pk>/update-links/', self.admin_site.admin_view(self.update_links_view),
@@ -89,20 +289,67 @@ class ImportActionMixin:
         ]
         return custom_urls + urls
 
-    def update_view(self, request, pk):
+    def preflight(self, item, obj):
+        return item.preflight()
+
+    def preflight_payload(self, obj, **kwargs):
+        with obj.payload.open('rb') as fp:
+            return preflight_units(iter_units(read_records(open_lines(fp))), **kwargs)
+
+    def _message_problems(self, request, problems, level):
+        if problems:
+            error_html = format_html_join(mark_safe("<br>"), "• {}", ((p.message,) for p in problems))
+            label = 'errors' if level == messages.ERROR else 'warnings'
+            full_message = format_html("<strong>{} preflight {}:</strong><br>{}", self.LABEL, label, error_html)
+            self.message_user(request, full_message, level)
+
+    def _is_payload_import(self, request, obj) -> bool:
+        """payload imports update model refs and links while importing, the actions on data don't apply
+        """
+        if getattr(obj, 'payload', None):
+            self.message_user(request, f"{self.LABEL} payload: model refs and internal links are updated by the "
+                "import.", messages.WARNING)
+            return True
+        return False
+
+    def preflight_view(self, request, pk):
         if not request.user.is_superuser:
             raise PermissionDenied
 
         obj = self.get_object(request, pk)
-        item = self.item_cls.from_dict(obj.data)
-        errors = item.update_model_refs()
+        with self.profiled(obj, 'preflight'):
+            if getattr(obj, 'payload', None):
+                plan = self.preflight_payload(obj)
+            else:
+                plan = self.preflight(self.item_cls.lazy(obj.data), obj)
+        obj.save()
 
-        if errors:
-            error_html = "<br>".join(f"• {e} not found." for e in errors)
-            full_message = mark_safe(f"<strong>{item.type} Model refs with warnings:</strong><br>{error_html}")
-            self.message_user(request, full_message, messages.WARNING)
+        self._message_problems(request, plan.fatal, messages.ERROR)
+        self._message_problems(request, plan.warnings, messages.WARNING)
+        counts = ", ".join(f"{n} {name}" for name, n in plan.counts.items())
+        if plan.fatal:
+            self.message_user(request, f"{self.LABEL} import would fail: {counts}", messages.ERROR)
+        else:
+            self.message_user(request, f"{self.LABEL} can be imported: {counts}", messages.SUCCESS)
+        return redirect(f'../')  # back to detail
 
-        obj.data = item.asdict()
+    def update_view(self, request, pk):
+        if not request.user.is_superuser:
+            raise PermissionDenied
+
+        obj = self.get_object(request, pk)
+        if self._is_payload_import(request, obj):
+            return redirect(f'../')
+        with self.profiled(obj, 'update'):
+            item = self.item_cls.lazy(obj.data)
+            errors = item.update_model_refs()
+
+            if errors:
+                error_html = "<br>".join(f"• {e} not found." for e in errors)
+                full_message = mark_safe(f"<strong>{item.type} Model refs with warnings:</strong><br>{error_html}")
+                self.message_user(request, full_message, messages.WARNING)
+
+            obj.data = item.asdict()
         obj.save()
 
         self.message_user(request, f"{item.type} Model Refs successfully updated!", messages.SUCCESS)
@@ -121,11 +368,48 @@ class ImportActionMixin:
             raise PermissionDenied
 
         obj = self.get_object(request, pk)
-        item = self.item_cls.from_dict(obj.data)
+        try:
+            with self.profiled(obj, 'import'):
+                self._import(request, obj)
+        except Exception as e:
+            if not getattr(obj, 'checkpoint', None):
+                raise
+            # resumable import, finished chunks are kept in obj.checkpoint
+            logger.exception(f'{obj}: import failed')
+            self.message_user(request, f"Import failed: {e} - {len(obj.checkpoint['pages'])} pages are imported, "
+                "import again to resume.", messages.ERROR)
+            return redirect(f'../')
+        obj.save()
+
+        return redirect(f'../')  # back to detail
+
+    def _import(self, request, obj):
+        payload = getattr(obj, 'payload', None)
+        if payload and (getattr(obj, 'sync', False) or getattr(obj, 'checkpoint', None)):
+            self.message_user(request, f"{self.LABEL} payloads are imported without sync and checkpoints, "
+                "paste the export into data instead.", messages.ERROR)
+            return
+
+        item = None if payload else self.item_cls.lazy(obj.data)
+        if hasattr(self.item_cls, 'preflight'):
+            plan = self.preflight_payload(obj) if payload else self.preflight(item, obj)
+            if plan.fatal:
+                # nothing is written, a failing import would leave a partial tree
+                self._message_problems(request, plan.fatal, messages.ERROR)
+                self.message_user(request, f"{self.LABEL} not imported!", messages.ERROR)
+                return
+
+        if payload:
+            return self._import_payload(request, obj)
 
         importer = self.get_importer(item, request.user, obj)
         importer.exec_import()
 
+        if importer.unmatched_slots:
+            error_html = "<br>".join(f"• {s} not found." for s in importer.unmatched_slots)
+            full_message = mark_safe(f"<strong>{item.type} placeholders not imported:</strong><br>{error_html}")
+            self.message_user(request, full_message, messages.WARNING)
+
         errors = self._update_internal_links(request, item)
         if errors:
             self.message_user(request, f"{item.type} successfully imported with internal link warnings!",
@@ -134,24 +418,48 @@ class ImportActionMixin:
             self.message_user(request, f"{item.type} successfully imported!", messages.SUCCESS)
 
         obj.data = item.asdict()
-        obj.save()
 
-        return redirect(f'../')  # back to detail
+    def _import_payload(self, request, obj):
+        """imports the uploaded payload streaming, model refs are updated per content and links after the import.
+        """
+        with obj.payload.open('rb') as fp:
+            importer = self.get_stream_importer(open_lines(fp), request.user, obj)
+            importer.exec_import()
+
+        if importer.model_ref_errors:
+            error_html = "<br>".join(f"• {e} not found." for e in importer.model_ref_errors)
+            full_message = mark_safe(f"<strong>{self.LABEL} Model refs with warnings:</strong><br>{error_html}")
+            self.message_user(request, full_message, messages.WARNING)
+
+        if importer.unmatched_slots:
+            error_html = "<br>".join(f"• {s} not found." for s in importer.unmatched_slots)
+            full_message = mark_safe(f"<strong>{self.LABEL} placeholders not imported:</strong><br>{error_html}")
+            self.message_user(request, full_message, messages.WARNING)
+
+        errors = importer.update_internal_links()
+        if errors:
+            error_html = "<br>".join(f"• {e} not found." for e in errors)
+            full_message = mark_safe(f"<strong>{self.LABEL} internal links with warnings:</strong><br>{error_html}")
+            self.message_user(request, full_message, messages.WARNING)
+        self.message_user(request, f"{self.LABEL} payload successfully imported!", messages.SUCCESS)
 
     def update_links_view(self, request, pk):
         if not request.user.is_superuser:
             raise PermissionDenied
 
         obj = self.get_object(request, pk)
-        item = self.item_cls.from_dict(obj.data)
-
-        errors = self._update_internal_links(request, item)
-        if errors:
-            self.message_user(request, f"{item.type} has internal link warnings!", messages.SUCCESS)
-        else:
-            self.message_user(request, f"{item.type}: all links successfully updated!", messages.SUCCESS)
-
-        obj.data = item.asdict()
+        if self._is_payload_import(request, obj):
+            return redirect(f'../')
+        with self.profiled(obj, 'update_links'):
+            item = self.item_cls.lazy(obj.data)
+
+            errors = self._update_internal_links(request, item)
+            if errors:
+                self.message_user(request, f"{item.type} has internal link warnings!", messages.SUCCESS)
+            else:
+                self.message_user(request, f"{item.type}: all links successfully updated!", messages.SUCCESS)
+
+            obj.data = item.asdict()
         obj.save()
 
         return redirect(f'../')  # back to detail
@@ -159,31 +467,82 @@ class ImportActionMixin:
 
 # PageImport Admin
 # ----------------
-class PageImportForm(forms.ModelForm):
+class PageImportForm(PayloadImportForm):
     parent_page = PageSearchField(required=False)
     class Meta:
         model = PageImport
         fields = '__all__'
+
+    def clean(self):
+        cleaned_data = super().clean()
+        if cleaned_data.get('payload') and cleaned_data.get('sync'):
+            self.add_error('sync', 'Sync is not supported for payload imports, paste the export into data instead.')
+        return cleaned_data
 @admin.register(PageImport)
-class PageImportAdmin(ImportActionMixin, admin.ModelAdmin):
+class PageImportAdmin(ImportActionMixin, DigestMixin, admin.ModelAdmin):
     form = PageImportForm
     item_cls = PageItem
     LABEL = 'Page'
     list_display = (PageImport, 'parent_page', 'modified_at')
-    readonly_fields = ('update_action', 'import_action', 'update_links_action')
+    readonly_fields = ('preflight_action', 'update_action', 'import_action', 'update_links_action', 'stats_table')
+
+    def preflight(self, item, obj):
+        # synced and resumed imports update existing pages
+        return item.preflight(check_reverse_ids=not (obj.sync or obj.checkpoint), site=self.get_site(obj),
+                              parent=obj.parent_page)
+
+    def preflight_payload(self, obj):
+        return super().preflight_payload(obj, site=self.get_site(obj), parent=obj.parent_page)
+
+    def get_site(self, obj) -> Site:
+        return obj.parent_page.site if obj.parent_page else Site.objects.get_current()
 
     def get_importer(self, item:TransferItem, user, obj):
-        return PageImporter(item, user, parent=obj.parent_page)
+        def save_checkpoint(checkpoint):
+            PageImport.objects.filter(pk=obj.pk).update(checkpoint=checkpoint)
+
+        return PageImporter(item, user, parent=obj.parent_page, sync=obj.sync, checkpoint=obj.checkpoint,
+                            on_checkpoint=save_checkpoint)
+
+    def get_stream_importer(self, lines, user, obj):
+        return PageStreamImporter(lines, user, parent=obj.parent_page)
 
 
 # AliasImport Admin
 # -----------------
+class AliasImportForm(PayloadImportForm):
+    class Meta:
+        model = AliasImport
+        fields = '__all__'
 @admin.register(AliasImport)
-class AliasImportAdmin(ImportActionMixin, admin.ModelAdmin):
+class AliasImportAdmin(ImportActionMixin, DigestMixin, admin.ModelAdmin):
+    form = AliasImportForm
     item_cls = AliasItem
     LABEL = 'Alias'
     list_display = (AliasImport, 'modified_at',)
-    readonly_fields = ('update_action', 'import_action',)
+    readonly_fields = ('preflight_action', 'update_action', 'import_action', 'stats_table')
 
     def get_importer(self, item:TransferItem, user, obj=None):
         return AliasImporter(item, user)
+
+    def get_stream_importer(self, lines, user, obj=None):
+        return AliasStreamImporter(lines, user)
+
+
+# PlaceholderImport Admin
+# -----------------------
+class PlaceholderImportForm(BundleImportForm):
+    placeholder = PlaceholderIdField(help_text=PlaceholderImport._meta.get_field('placeholder').help_text)
+    class Meta:
+        model = PlaceholderImport
+        fields = '__all__'
+@admin.register(PlaceholderImport)
+class PlaceholderImportAdmin(ImportActionMixin, DigestMixin, admin.ModelAdmin):
+    form = PlaceholderImportForm
+    item_cls = PlaceholderItem
+    LABEL = 'Placeholder'
+    list_display = (PlaceholderImport, 'placeholder', 'language', 'modified_at')
+    readonly_fields = ('preflight_action', 'update_action', 'import_action', 'update_links_action', 'stats_table')
+
+    def get_importer(self, item:TransferItem, user, obj):
+        return PlaceholderImporter(item, user, placeholder=obj.placeholder, language=obj.language or None)
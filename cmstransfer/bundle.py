@@ -0,0 +1,145 @@
+"""Zip bundles of a transfer with its referenced filer files.
+
+    transfer.json       the exported item
+    files.json          manifest: sha1 -> model, name, original_filename, folder path
+    files/<sha1>        file contents, stored once per sha1
+
+Filer refs in plugin configs get their sha1 on export, so that `update_model_refs` finds the files on the target
+by sha1. On import only files whose sha1 does not exist on the target are written.
+"""
+import json
+import logging
+import shutil
+import zipfile
+
+from django.apps import apps
+from django.conf import settings
+from django.core.files import File as DjangoFile
+from django.db import DEFAULT_DB_ALIAS
+from filer.models import File, Folder
+
+from .items import TransferItem
+from .serializers import JsonEncoder
+
+logger = logging.getLogger(__name__)
+
+TRANSFER_NAME = 'transfer.json'
+MANIFEST_NAME = 'files.json'
+CHUNK_SIZE = 1024 * 1024
+
+
+def get_file_refs(item: TransferItem) -> list[dict]:
+    """all filer file refs ({'model': 'filer.image', 'pk': 3, ..}) in the ref table and plugin configs of item
+    """
+    refs = [v for v in getattr(item, 'refs', {}).values() if is_file_ref(v)]
+    for plugin in item.collect_plugins():
+        config = plugin.config if not '_json' in plugin.config else plugin.config.get('_json')
+        refs.extend(v for v in config.values() if is_file_ref(v))
+    return refs
+
+
+def is_file_ref(value) -> bool:
+    """refs to filer files (File and its subclasses), other filer refs (e.g. folders) stay plain model refs
+    """
+    if not isinstance(value, dict) or not str(value.get('model', '')).startswith('filer.') or not value.get('pk'):
+        return False
+    try:
+        return issubclass(apps.get_model(value['model']), File)
+    except (LookupError, ValueError):
+        return False
+
+
+def load_files(refs: list[dict], using: str = None) -> dict[str, File]:
+    """sha1 -> filer file of refs, read with one query per filer model. The refs are updated with the sha1.
+    """
+    pks_by_model = {}
+    for ref in refs:
+        pks_by_model.setdefault(ref['model'], set()).add(ref['pk'])
+
+    objs = {}
+    for mdl_str, pks in pks_by_model.items():
+        mdl = apps.get_model(mdl_str)
+        objs[mdl_str] = mdl.objects.using(using or DEFAULT_DB_ALIAS).select_related('folder').in_bulk(pks)
+
+    files = {}
+    for ref in refs:
+        obj = objs[ref['model']].get(ref['pk'])
+        if obj is None or not obj.sha1:
+            logger.warning(f'file not bundled: {ref}')
+            continue
+        ref['sha1'] = obj.sha1
+        files.setdefault(obj.sha1, obj)
+    return files
+
+
+def get_folder_path(obj: File) -> list[str]:
+    if not obj.folder:
+        return []
+    return [folder.name for folder in obj.folder.logical_path] + [obj.folder.name]
+
+
+def write_bundle(fp, item: TransferItem, using: str = None):
+    """writes item and its referenced filer files as zip to the (binary) file like object fp. Files are copied
+    in chunks, the item is updated with the sha1 of its file refs.
+    """
+    using = using or getattr(settings, 'CONTENT_TRANSFER_EXPORT_DATABASE', DEFAULT_DB_ALIAS)
+    files = load_files(get_file_refs(item), using)
+
+    manifest = {}
+    with zipfile.ZipFile(fp, 'w') as zf:
+        for sha1, obj in files.items():
+            manifest[sha1] = {
+                'model': f'{obj._meta.app_label}.{obj._meta.model_name}',
+                'name': obj.name,
+                'original_filename': obj.original_filename,
+                'folder': get_folder_path(obj),
+            }
+            # media files are mostly compressed already, so they are stored as they are
+            with obj.file.open('rb') as src, zf.open(f'files/{sha1}', 'w') as dst:
+                shutil.copyfileobj(src, dst, CHUNK_SIZE)
+
+        zf.writestr(MANIFEST_NAME, json.dumps(manifest, indent=2), compress_type=zipfile.ZIP_DEFLATED)
+        zf.writestr(
+            TRANSFER_NAME, json.dumps(item.asdict(), cls=JsonEncoder, ensure_ascii=False),
+            compress_type=zipfile.ZIP_DEFLATED
+        )
+
+
+def read_bundle(fp, user=None) -> tuple[dict, dict]:
+    """reads a bundle from fp and writes its files, which do not exist on the target (by sha1).
+
+    Returns:
+        tuple[dict, dict]: transfer data and stats {'written': n, 'existing': n}
+    """
+    with zipfile.ZipFile(fp) as zf:
+        manifest = json.loads(zf.read(MANIFEST_NAME))
+        data = json.loads(zf.read(TRANSFER_NAME))
+
+        existing = set(File.objects.filter(sha1__in=manifest.keys()).values_list('sha1', flat=True))
+        for sha1, entry in manifest.items():
+            if sha1 in existing:
+                continue
+            with zf.open(f'files/{sha1}') as src:
+                obj = create_file(entry, src, user)
+            if obj.sha1 != sha1:
+                logger.warning(f'{entry["original_filename"]}: sha1 mismatch {obj.sha1} != {sha1}')
+
+    return data, {'written': len(manifest) - len(existing), 'existing': len(existing)}
+
+
+def create_file(entry: dict, src, user=None) -> File:
+    mdl = apps.get_model(entry['model'])
+    return mdl.objects.create(
+        file=DjangoFile(src, name=entry['original_filename']),
+        original_filename=entry['original_filename'],
+        name=entry['name'] or '',
+        folder=get_or_create_folder(entry['folder'], user),
+        owner=user,
+    )
+
+
+def get_or_create_folder(path: list[str], user=None) -> Folder:
+    folder = None
+    for name in path:
+        folder, _ = Folder.objects.get_or_create(name=name, parent=folder, defaults={'owner': user})
+    return folder
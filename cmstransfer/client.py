@@ -0,0 +1,115 @@
+"""Client for the export endpoint of another instance (see views.py), fetches exports into import models.
+
+    client = TransferClient('https://source.example.com/transfer/', token='...')
+    page_import, etag = client.pull_page(42, recursive=True)
+
+The http requests are made by a transport: a callable `transport(url, headers) -> (status, headers, fp)` returning
+the status code, the response headers and a (binary) file like object with the body. `urllib_transport` is used by
+default, `django_client_transport` calls a local instance with Django's test client.
+"""
+import gzip
+import io
+import json
+import urllib.error
+import urllib.request
+from typing import Callable
+from urllib.parse import urljoin
+
+from django.conf import settings
+
+from .models import PageImport, AliasImport
+
+import logging
+logger = logging.getLogger(__name__)
+
+Transport = Callable[[str, dict], tuple]
+
+
+class TransferError(Exception):
+    pass
+
+
+def urllib_transport(url: str, headers: dict) -> tuple:
+    request = urllib.request.Request(url, headers=headers)
+    try:
+        response = urllib.request.urlopen(request, timeout=getattr(settings, 'CONTENT_TRANSFER_TIMEOUT', 60))
+    except urllib.error.HTTPError as e:
+        return e.code, dict(e.headers), e
+    return response.status, dict(response.headers), response
+
+
+def django_client_transport(client) -> Transport:
+    """transport calling the urls with client (a django.test.Client), url should be a path
+    """
+    def transport(url: str, headers: dict) -> tuple:
+        response = client.get(url, headers=headers)
+        body = b''.join(response.streaming_content) if response.streaming else response.content
+        return response.status_code, dict(response.headers), io.BytesIO(body)
+    return transport
+
+
+class TransferClient:
+    def __init__(self, base_url: str, token: str = None, transport: Transport = None):
+        """base_url is the url the cmstransfer urls are included with on the source instance
+        """
+        self.base_url = base_url
+        self.token = token
+        self.transport = transport or urllib_transport
+
+    def fetch(self, model: str, pk: int, recursive=False, etag: str = None, digest=False) -> tuple[dict, str]:
+        """fetches the export (or only its digest) of the model (page/alias) with pk.
+
+        Returns:
+            tuple[dict, str]: export data (None if not modified since etag) and the etag of the export
+        """
+        url = urljoin(self.base_url, f'export/{model}/{pk}/')
+        params = [name for name, value in (('recursive', recursive), ('digest', digest)) if value]
+        if params:
+            url += '?' + '&'.join(f'{name}=1' for name in params)
+
+        headers = {'Accept-Encoding': 'gzip'}
+        if self.token:
+            headers['Authorization'] = f'Token {self.token}'
+        if etag:
+            headers['If-None-Match'] = etag
+
+        status, response_headers, fp = self.transport(url, headers)
+        if status == 304:
+            return None, etag
+        if status != 200:
+            raise TransferError(f'{url}: export failed with status {status}')
+
+        if response_headers.get('Content-Encoding') == 'gzip':
+            fp = gzip.GzipFile(fileobj=fp)
+        with fp:
+            data = json.load(fp)
+        return data, response_headers.get('ETag')
+
+    def fetch_digest(self, model: str, pk: int, recursive=False) -> dict:
+        """the merkle digest of the export of the model (page/alias) with pk, to compare it with a local one
+        """
+        data, _ = self.fetch(model, pk, recursive=recursive, digest=True)
+        return data
+
+    def pull_page(self, pk: int, recursive=False, etag: str = None, **kwargs) -> tuple[PageImport, str]:
+        """fetches the page export with pk into a new PageImport (kwargs are its fields, e.g. parent_page).
+
+        Returns:
+            tuple[PageImport, str]: the page import (None if not modified since etag) and the etag of the export
+        """
+        data, etag = self.fetch('page', pk, recursive=recursive, etag=etag)
+        if data is None:
+            return None, etag
+        page_import = PageImport.objects.create(data=data, **kwargs)
+        logger.info(f'{page_import}: pulled from {self.base_url}')
+        return page_import, etag
+
+    def pull_alias(self, pk: int, etag: str = None) -> tuple[AliasImport, str]:
+        """fetches the alias export with pk into a new AliasImport.
+        """
+        data, etag = self.fetch('alias', pk, etag=etag)
+        if data is None:
+            return None, etag
+        alias_import = AliasImport.objects.create(data=data)
+        logger.info(f'{alias_import}: pulled from {self.base_url}')
+        return alias_import, etag
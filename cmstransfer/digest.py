@@ -0,0 +1,130 @@
+"""Merkle digests of transfer items, to compare page trees of two instances without diffing their exports.
+
+Every page, content, placeholder and plugin is a node:
+
+    {'key': 'home', 'data': '<sha1 of own fields>', 'hash': '<sha1 of data and child hashes>', 'children': [...]}
+
+Keys identify a node between instances (db ids differ): pages by reverse id or the slug of a fixed language, contents
+by language, placeholders by slot and plugins by position and type. Contents are sorted by language, the page title
+(of the active language on export) and the order of the page languages are not hashed. `compare` descends only into
+nodes with differing hashes.
+"""
+import hashlib
+import json
+from dataclasses import fields
+
+from django.conf import settings
+
+from .items import TransferItem, PageItem, AliasItem
+from .ndjson import ITEM_CLASSES, CHILD_FIELDS
+from .refs import expand
+from .serializers import JsonEncoder
+
+# db ids, which differ between instances, and the ref table, which is expanded into the plugin configs
+ID_FIELDS = ('page_id', 'alias_id', 'id', 'refs')
+# fields depending on the export (active language, query order), not on the content
+UNSTABLE_FIELDS = {'page': ('title',)}
+SORTED_FIELDS = ('languages',)
+CONTENT_FIELDS = ('page_contents', 'alias_contents')
+REF_ID_KEYS = ('pk', 'p_keys')
+
+
+def item_digest(item: TransferItem, key: str = '', refs: dict = None) -> dict:
+    """the digest (tree) of item, refs is the ref table of the top level item (see refs.py)
+    """
+    if refs is None:
+        refs = getattr(item, 'refs', None) or {}
+    list_fields = CHILD_FIELDS[ITEM_CLASSES[item.type]].values()
+    data = {
+        f.name: getattr(item, f.name) for f in fields(item)
+        if f.name not in list_fields and f.name not in ID_FIELDS and f.name not in UNSTABLE_FIELDS.get(item.type, ())
+    }
+    for name in SORTED_FIELDS:
+        if name in data:
+            data[name] = sorted(data[name])
+    data_hash = sha1(strip_ref_ids(expand(data, refs)))
+
+    children = []
+    for name in list_fields:
+        child_items = getattr(item, name)
+        if name in CONTENT_FIELDS:
+            child_items = sorted(child_items, key=lambda content: content.language)
+        for idx, child in enumerate(child_items):
+            children.append(item_digest(child, get_key(child, idx), refs))
+
+    return {
+        'key': key or get_key(item, 0),
+        'data': data_hash,
+        'hash': sha1([data_hash] + [(child['key'], child['hash']) for child in children]),
+        'children': children,
+    }
+
+
+def get_key(item: TransferItem, idx: int) -> str:
+    if isinstance(item, PageItem):
+        content = get_key_content(item.page_contents)
+        return item.reverse_id or (content.slug if content else '') or str(idx)
+    if isinstance(item, AliasItem):
+        content = get_key_content(item.alias_contents)
+        return content.name if content else str(item.alias_id)
+    if item.type in ('pagecontent', 'aliascontent'):
+        return item.language
+    if item.type == 'placeholder':
+        return item.slot
+    return f'{idx}:{item.plugin_type}'
+
+
+def get_key_content(contents: list):
+    """the content of the default language (or of the first language), which keys its page/alias
+    """
+    for content in contents:
+        if content.language == settings.LANGUAGE_CODE:
+            return content
+    return min(contents, key=lambda content: content.language) if contents else None
+
+
+def strip_ref_ids(value):
+    """value without the pks of model refs, which have other lookup keys (e.g. sha1)
+    """
+    if isinstance(value, dict):
+        has_lookup = 'model' in value and set(value) - {'model', *REF_ID_KEYS}
+        return {
+            k: strip_ref_ids(v) for k, v in value.items()
+            if not (has_lookup and k in REF_ID_KEYS)
+        }
+    if isinstance(value, list):
+        return [strip_ref_ids(v) for v in value]
+    return value
+
+
+def sha1(value) -> str:
+    return hashlib.sha1(json.dumps(value, cls=JsonEncoder, sort_keys=True).encode()).hexdigest()
+
+
+def compare(a: dict, b: dict) -> list[tuple[str, str]]:
+    """the differing subtrees of the digests a and b, descends only into nodes with differing hashes.
+
+    Returns:
+        list[tuple[str, str]]: (path, 'changed' | 'added' | 'removed'), added/removed means only in b/a
+    """
+    differences = []
+    compare_nodes(a, b, a['key'], differences)
+    return differences
+
+
+def compare_nodes(a: dict, b: dict, path: str, differences: list):
+    if a['hash'] == b['hash']:
+        return
+    if a['data'] != b['data']:
+        differences.append((path, 'changed'))
+
+    a_children = {child['key']: child for child in a['children']}
+    b_children = {child['key']: child for child in b['children']}
+    for key, child in a_children.items():
+        if key not in b_children:
+            differences.append((f'{path}/{key}', 'removed'))
+        else:
+            compare_nodes(child, b_children[key], f'{path}/{key}', differences)
+    for key in b_children:
+        if key not in a_children:
+            differences.append((f'{path}/{key}', 'added'))
@@ -1,27 +1,57 @@
+import hashlib
 import json
-from cms.models import Page, PageContent, Placeholder, CMSPlugin
+from collections import defaultdict
+from cms.models import Page, PageContent, PageUrl, Placeholder, CMSPlugin, UserSettings
+from cms.models.pagemodel import AdminCacheDict
 from cms.plugin_base import CMSPluginBase
 from cms.plugin_pool import plugin_pool
-from cmsplus.models import PlusItem
+from cms.utils.i18n import get_default_language
 from django.conf import settings
-from djangocms_text.models import Text as TextPlugin
+from django.db.models import Prefetch, prefetch_related_objects
+from django.core.cache import caches
+from django.db import DEFAULT_DB_ALIAS
 from djangocms_alias.models import Alias, AliasContent
+from .digest import item_digest
+from .instrumentation import instrumented, phase, count
+from .plugin_codecs import registry as codec_registry, encode_value
 from .serializers import JsonEncoder, get_related_object
+from .ndjson import NdjsonWriter
 from .items import PageItem, PageContentItem, PlaceholderItem, PluginItem, AliasContentItem, AliasItem
 
 # Mixins
 #-------
 class ToJsonMixin:
     def to_json(self):
-        return json.dumps(self.export().asdict(), cls=JsonEncoder, indent=2, ensure_ascii=False)
+        item = self.export()
+        with phase('to_json'):
+            return json.dumps(item.asdict(), cls=JsonEncoder, indent=2, ensure_ascii=False)
+
+    def digest(self) -> dict:
+        """merkle digest of the export, see digest.py
+        """
+        item = self.export()
+        with phase('digest'):
+            return item_digest(item)
 
 
 class PluginMixin:
-    def __init__(self):
+    def __init__(self, using: str = None):
         self.encoder = JsonEncoder()
+        # database alias all export queries are routed to, e.g. a read replica
+        self.using = using or getattr(settings, 'CONTENT_TRANSFER_EXPORT_DATABASE', DEFAULT_DB_ALIAS)
 
-    def build_plugin_item(self, plugin: CMSPluginBase) -> PluginItem:
-        instance, plugin_class = plugin.get_plugin_instance()
+    def load(self, obj):
+        """obj read from the export database, related managers of the result query the same database.
+        """
+        if obj._state.db == self.using:
+            return obj
+        return type(obj).objects.using(self.using).get(pk=obj.pk)
+
+    def build_plugin_item(self, plugin: CMSPluginBase, tree: dict[int, list[CMSPlugin]] = None) -> PluginItem:
+        """plugin item with children, which are taken from tree (see load_plugin_tree) if given
+        """
+        count('plugins')
+        instance, plugin_class = self.get_plugin_instance(plugin)
 
         plugin_item = PluginItem(
             type="plugin",
@@ -29,44 +59,24 @@ class PluginMixin:
             config=self.serialize_instance(instance, plugin_class),
         )
 
-        for child in plugin.get_children().order_by('position'):
-            child_item = self.build_plugin_item(child)
+        children = tree.get(plugin.pk, []) if tree is not None else plugin.get_children().order_by('position')
+        for child in children:
+            child_item = self.build_plugin_item(child, tree)
             plugin_item.children.append(child_item)
 
         return plugin_item
 
+    def get_plugin_instance(self, plugin: CMSPlugin):
+        """downcasts plugin like CMSPlugin.get_plugin_instance() but reads from the export database
+        """
+        model = plugin.get_plugin_class().model
+        if not hasattr(plugin, '_inst') and model._meta.concrete_model != plugin._meta.concrete_model:
+            plugin._inst = model.objects.using(self.using).filter(cmsplugin_ptr=plugin).first()
+        return plugin.get_plugin_instance()
+
     def serialize_instance(self, instance: CMSPlugin, plugin_class: CMSPluginBase):
         """Serializes the instance instance to a dict"""
-        config = {}
-        if isinstance(instance, PlusItem):
-            # handle PlusItem
-
-            # update model values in config
-            self.update_model_values(instance.config)
-            self.update_internal_links(instance.config)
-            config['_json'] = instance.config
-
-
-        elif isinstance(instance, TextPlugin):
-            # handle TextPlugin
-            config = {
-                'body': instance.body,
-                'json': instance.json,
-                'rte': 'ckeditor4',
-            }
-        else:
-            # handle other CMSPlugin
-            #  instances which have fields, which are not json - serializible may have a serialize method
-            if hasattr(instance, 'serialize'):
-                config = instance.serialize()
-            else:
-                # put form fields and values into dict
-                plugin_fields = plugin_class.form.base_fields
-                for field_name in plugin_fields.keys():
-                    if hasattr(instance, field_name):
-                        v = getattr(instance, field_name)
-                        config[field_name] = self.serialize_value(v)
-        return config
+        return codec_registry.get(instance.plugin_type).encode(instance, self)
 
     def update_model_values(self, config):
         """update model values with extra lookup if configured to be able to use search_related_object() during import
@@ -79,7 +89,7 @@ class PluginMixin:
                 continue
 
             key = lookup_keys_by_mdlstr[mdl_str]
-            obj = get_related_object(mdl_value)
+            obj = get_related_object(mdl_value, using=self.using)
             if obj:
                 mdl_value[key] = getattr(obj, key, None)
 
@@ -94,53 +104,186 @@ class PluginMixin:
             if not pk: continue
 
             try:
-                obj = get_related_object({'model': model_str, 'pk': pk})
+                obj = get_related_object({'model': model_str, 'pk': pk}, using=self.using)
                 abs_url = obj.get_absolute_url()
             except:
                 continue
             link_value['internal_link'] = f'{model_str}:{abs_url}'
 
     def serialize_value(self, value):
-        if isinstance(value, (list, tuple)):
-            return [self.serialize_value(v) for v in value]
-        elif isinstance(value, dict):
-            return {k: self.serialize_value(v) for k, v in value.items()}
-        else:
-            try:
-                return self.encoder.default(value)
-            except TypeError:
-                return value  # fallback for primitives
+        return encode_value(value)
 
 class PlaceholderMixin(PluginMixin):
+    @instrumented('build_placeholder_item')
     def build_placeholder_item(self, placeholder: Placeholder, language: str) -> PlaceholderItem:
+        """serialized placeholder, served from the fragment cache (if configured) as long as its plugins are unchanged.
+        Fragments are cached before model values and internal links are resolved, so these are always current.
+        """
+        count('placeholders')
+        cache = get_fragment_cache()
+        if cache is None:
+            return self.serialize_placeholder(placeholder, language)
+
+        key = self.get_fragment_key(placeholder, language)
+        data = cache.get(key)
+        if data is not None:
+            count('cached_placeholders')
+            placeholder_item = PlaceholderItem.from_dict(data)
+        else:
+            placeholder_item = self.encode_placeholder(placeholder, language)
+            cache.set(key, placeholder_item.asdict())
+        self.resolve_plugin_refs(placeholder_item.plugins)
+        return placeholder_item
+
+    def serialize_placeholder(self, placeholder: Placeholder, language: str) -> PlaceholderItem:
+        placeholder_item = self.encode_placeholder(placeholder, language)
+        self.resolve_plugin_refs(placeholder_item.plugins)
+        return placeholder_item
+
+    def encode_placeholder(self, placeholder: Placeholder, language: str) -> PlaceholderItem:
+        """placeholder item with the encoded plugins, model values and internal links are not resolved yet
+        """
         placeholder_item = PlaceholderItem(
             type="placeholder",
             slot=placeholder.slot,
             extra_context=placeholder.get_extra_context()
         )
 
-        root_plugin_ids = placeholder.get_plugin_tree_order(language)
-        for id in root_plugin_ids:
-            plugin = placeholder.get_plugins().get(id=id)
-            plugin_item = self.build_plugin_item(plugin)
+        tree = self.load_plugin_tree(placeholder, language)
+        for plugin in tree.get(None, []):
+            plugin_item = self.build_plugin_item(plugin, tree)
             placeholder_item.plugins.append(plugin_item)
 
         return placeholder_item
 
+    def resolve_plugin_refs(self, plugin_items: list[PluginItem]):
+        """adds lookup keys to model values and replaces internal link pks by urls in the configs of PlusItems
+        """
+        for plugin_item in plugin_items:
+            config = plugin_item.config.get('_json')
+            if config:
+                self.update_model_values(config)
+                self.update_internal_links(config)
+            self.resolve_plugin_refs(plugin_item.children)
+
+    def load_plugin_tree(self, placeholder: Placeholder, language: str) -> dict[int, list[CMSPlugin]]:
+        """all plugins of placeholder by parent id (None for root plugins) ordered by position. The plugins are
+        loaded with one query and downcast with one query per plugin model.
+        """
+        plugins = list(placeholder.get_plugins(language).order_by('position'))
+
+        pks_by_model = defaultdict(list)
+        for plugin in plugins:
+            model = plugin.get_plugin_class().model
+            if model._meta.concrete_model != plugin._meta.concrete_model:
+                pks_by_model[model].append(plugin.pk)
+
+        instances = {}
+        for model, pks in pks_by_model.items():
+            instances.update(model.objects.using(self.using).in_bulk(pks))
+
+        tree = defaultdict(list)
+        for plugin in plugins:
+            if plugin.pk in instances:
+                plugin._inst = instances[plugin.pk]
+            tree[plugin.parent_id].append(plugin)
+        return tree
+
+    def get_fragment_key(self, placeholder: Placeholder, language: str) -> str:
+        """cache key of placeholder, which changes with any added, removed, moved or changed plugin
+        """
+        plugins = placeholder.get_plugins(language).order_by('pk').values_list(
+            'pk', 'parent_id', 'position', 'changed_date'
+        )
+        fingerprint = hashlib.sha1()
+        n = 0
+        for values in plugins:
+            fingerprint.update(repr(values).encode())
+            n += 1
+        return (
+            f'cmstransfer:placeholder:{get_fragment_version()}:{self.using}:{placeholder.pk}:{language}:{n}:'
+            f'{fingerprint.hexdigest()}'
+        )
+
+
+def get_fragment_cache():
+    """the cache for serialized placeholders, configured by CONTENT_TRANSFER_FRAGMENT_CACHE (cache alias)
+    """
+    alias = getattr(settings, 'CONTENT_TRANSFER_FRAGMENT_CACHE', None)
+    return caches[alias] if alias else None
+
+
+def get_fragment_version() -> str:
+    """version of the encoded plugins (see CodecRegistry.fingerprint), fragments cached by other versions are not used
+    """
+    return hashlib.sha1(codec_registry.fingerprint().encode()).hexdigest()[:12]
+
 
 # PageExporter
 # ------------
 class PageExporter(PlaceholderMixin, ToJsonMixin):
-    def __init__(self, page: Page, recursive=False):
-        super().__init__()
-        self.page = page
+    def __init__(self, page: Page, recursive=False, using: str = None):
+        super().__init__(using=using)
+        self.page = self.load(page)
         self.recursive = recursive
+        self.child_pages = None  # page pk -> child pages, set by prefetch_pages
 
+    @instrumented('export')
     def export(self) -> PageItem:
-        return self.build_page_item(self.page, self.recursive)
+        if self.recursive:
+            self.prefetch_pages(self.page)
+        page_item = self.build_page_item(self.page, self.recursive)
+        page_item.collect_refs()
+        return page_item
+
+    @instrumented('prefetch_pages')
+    def prefetch_pages(self, page: Page):
+        """loads page and all its descendants with their contents, urls and placeholders in a few queries and fills
+        the page caches, so the tree is built from memory.
+        """
+        pages = [page] + list(
+            Page.objects.using(self.using).filter(path__startswith=page.path, depth__gt=page.depth).order_by('path')
+        )
+        prefetch_related_objects(
+            pages,
+            Prefetch('pagecontent_set', queryset=PageContent.objects.using(self.using)),
+            Prefetch('pagecontent_set__placeholders', queryset=Placeholder.objects.using(self.using)),
+            Prefetch('urls', queryset=PageUrl.objects.using(self.using)),
+        )
+
+        admin_contents = defaultdict(list)
+        pks = [p.pk for p in pages]
+        for content in PageContent.admin_manager.using(self.using).filter(page__in=pks).latest_content():
+            admin_contents[content.page_id].append(content)
+
+        self.child_pages = defaultdict(list)
+        by_path = {p.path: p for p in pages}
+        for p in pages:
+            p.admin_content_cache = AdminCacheDict((c.language, c) for c in admin_contents[p.pk])
+            parent = by_path.get(p.path[:-p.steplen])
+            if p is not page and parent:
+                self.child_pages[parent.pk].append(p)
+        count('prefetched_pages', len(pages))
 
     def build_page_item(self, page: Page, recursive=False) -> PageItem:
-        page_item = PageItem(
+        page_item = self.create_page_item(page)
+
+        for page_content in self.get_page_contents(page):
+            page_content_item = self.build_page_content_item(page_content)
+            page_item.page_contents.append(page_content_item)
+
+        if recursive:
+            for child_page in self.get_child_pages(page):
+                child_page_item = self.build_page_item(child_page, recursive)
+                page_item.pages.append(child_page_item)
+
+        return page_item
+
+    def create_page_item(self, page: Page) -> PageItem:
+        """the page item without contents and child pages
+        """
+        count('pages')
+        return PageItem(
             type="page",
             page_id=page.id,
             reverse_id=page.reverse_id,
@@ -150,18 +293,39 @@ class PageExporter(PlaceholderMixin, ToJsonMixin):
             languages=[lang for lang in page.get_languages()],
         )
 
-        for page_content in PageContent.objects.filter(page=page):
-            page_content_item = self.build_page_content_item(page_content)
-            page_item.page_contents.append(page_content_item)
+    def get_page_contents(self, page: Page):
+        if self.child_pages is not None:
+            return page.pagecontent_set.all()
+        return PageContent.objects.using(self.using).filter(page=page)
 
-        if recursive:
-            for child_page in page.get_child_pages():
-                child_page_item = self.build_page_item(child_page, recursive)
-                page_item.pages.append(child_page_item)
+    def get_child_pages(self, page: Page):
+        if self.child_pages is not None:
+            return self.child_pages[page.pk]
+        return page.get_child_pages().using(self.using)
 
-        return page_item
+    def write_records(self, writer: NdjsonWriter, page: Page, parent: int = None, position: int = 0):
+        """writes the records of page, its contents and (if recursive) its child pages. Only one page content
+        item is held in memory at a time.
+        """
+        page_id = writer.write(self.create_page_item(page), parent, position)
+
+        for idx, page_content in enumerate(self.get_page_contents(page)):
+            writer.write_item(self.build_page_content_item(page_content), page_id, idx)
+
+        if self.recursive:
+            for idx, child_page in enumerate(self.get_child_pages(page)):
+                self.write_records(writer, child_page, page_id, idx)
+
+    @instrumented('export')
+    def to_ndjson(self, fp):
+        """writes the export as ndjson records to the file like object fp
+        """
+        if self.recursive:
+            self.prefetch_pages(self.page)
+        self.write_records(NdjsonWriter(fp, 'page'), self.page)
 
     def build_page_content_item(self, page_content: PageContent) -> PageContentItem:
+        count('contents')
         content_item = PageContentItem(
             type="pagecontent",
             language=page_content.language,
@@ -184,28 +348,49 @@ class PageExporter(PlaceholderMixin, ToJsonMixin):
 # AliasExporter
 # -------------
 class AliasExporter(PlaceholderMixin, ToJsonMixin):
-    def __init__(self, alias: Alias):
-        super().__init__()
-        self.alias = alias
+    def __init__(self, alias: Alias, using: str = None):
+        super().__init__(using=using)
+        self.alias = self.load(alias)
 
+    @instrumented('export')
     def export(self) -> AliasItem:
-        return self.build_alias_item(self.alias)
+        alias_item = self.build_alias_item(self.alias)
+        alias_item.collect_refs()
+        return alias_item
 
     def build_alias_item(self, alias: Alias) -> AliasItem:
-        alias_item = AliasItem(
+        alias_item = self.create_alias_item(alias)
+
+        for alias_content in self.get_alias_contents(alias):
+            alias_content_item = self.build_alias_content_item(alias_content)
+            alias_item.alias_contents.append(alias_content_item)
+
+        return alias_item
+
+    def create_alias_item(self, alias: Alias) -> AliasItem:
+        """the alias item without contents
+        """
+        return AliasItem(
             type="alias",
             alias_id=alias.id,
             category=alias.category.name,
             languages=[lang for lang in alias.get_languages()],
         )
 
-        for alias_content in AliasContent.objects.filter(alias=alias):
-            alias_content_item = self.build_alias_content_item(alias_content)
-            alias_item.alias_contents.append(alias_content_item)
+    def get_alias_contents(self, alias: Alias):
+        return AliasContent.objects.using(self.using).filter(alias=alias)
 
-        return alias_item
+    @instrumented('export')
+    def to_ndjson(self, fp):
+        """writes the export as ndjson records to the file like object fp
+        """
+        writer = NdjsonWriter(fp, 'alias')
+        alias_id = writer.write(self.create_alias_item(self.alias))
+        for idx, alias_content in enumerate(self.get_alias_contents(self.alias)):
+            writer.write_item(self.build_alias_content_item(alias_content), alias_id, idx)
 
     def build_alias_content_item(self, alias_content: AliasContent) -> AliasContentItem:
+        count('contents')
         content_item = AliasContentItem(
             type="aliascontent",
             language=alias_content.language,
@@ -218,3 +403,31 @@ class AliasExporter(PlaceholderMixin, ToJsonMixin):
             content_item.placeholders.append(placeholder_item)
 
         return content_item
+
+
+# PlaceholderExporter
+# -------------------
+class PlaceholderExporter(PlaceholderMixin, ToJsonMixin):
+    def __init__(self, placeholder: Placeholder = None, language: str = None, user=None, using: str = None):
+        """exports the plugins of one language (default: the default language) of placeholder or, if not given, of
+        the clipboard of user. A placeholder item is imported into one language, so languages are never mixed.
+        """
+        super().__init__(using=using)
+        self.placeholder = self.load(placeholder) if placeholder else self.get_clipboard(user)
+        self.language = language or get_default_language()
+
+    @instrumented('export')
+    def export(self) -> PlaceholderItem:
+        placeholder_item = self.build_placeholder_item(self.placeholder, self.language)
+        placeholder_item.collect_refs()
+        return placeholder_item
+
+    def get_clipboard(self, user) -> Placeholder:
+        """the placeholder holding the clipboard plugins of user, "Copy all" wraps them in a placeholder reference.
+        """
+        clipboard = UserSettings.objects.using(self.using).select_related('clipboard').get(user=user).clipboard
+        reference = clipboard.get_plugins().filter(plugin_type='PlaceholderPlugin').first()
+        if reference:
+            instance, _ = self.get_plugin_instance(reference)
+            return instance.placeholder_ref
+        return clipboard
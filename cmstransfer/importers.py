@@ -1,11 +1,29 @@
+from dataclasses import replace
 from re import template
-from cms.api import create_page, create_page_content, add_plugin
-from cms.models import Page, PageContent, Placeholder
-from django.core.exceptions import ObjectDoesNotExist
+from typing import Iterable
+from cms import constants
+from cms.api import create_page, add_plugin
+from cms.models import Page, PageContent, PageUrl, Placeholder, CMSPlugin, UserSettings
+from cms.models.placeholderpluginmodel import PlaceholderReference
+from cms.plugin_pool import plugin_pool
+from cms.utils.page import get_clean_username
+from cms.utils.placeholder import get_declared_placeholders_for_obj, rescan_placeholders_for_obj
+from django.apps import apps
+from django.conf import settings
+from django.contrib.sites.models import Site
+from django.core.exceptions import FieldError
+from django.db import DEFAULT_DB_ALIAS, connection, models, transaction
+from django.db.models import F, Q
+from django.utils.text import slugify
+from treebeard.mp_tree import MP_Node
 from djangocms_alias.models import Alias, AliasContent, Category
 from djangocms_alias.utils import is_versioning_enabled
 
-from .serializers import get_related_object
+from .exporters import PageExporter
+from .instrumentation import instrumented, count
+from .ndjson import read_records, iter_units
+from .plugin_codecs import registry as codec_registry
+from .refs import expand_config, get_plugin_values, resolve_model_values, update_table_refs
 from .items import PageItem, PageContentItem, PlaceholderItem, PluginItem, AliasItem, AliasContentItem
 
 import logging
@@ -14,23 +32,22 @@ logger = logging.getLogger(__name__)
 # Mixins
 # ------
 class PluginMixin:
-    def import_plugin(self, placeholder: Placeholder, plugin_item: PluginItem, language: str, parent=None):
-        if not '_json' in plugin_item.config:
-            # no PlusItem, so we may have to deserialize
-            for k, v in plugin_item.config.items():
-                plugin_item.config[k] = self.deserialize_value(v, plugin_item.plugin_type, language)
+    refs: dict = None # ref table of the imported item, set per importer in __init__, see refs.py
 
+    def import_plugin(self, placeholder: Placeholder, plugin_item: PluginItem, language: str, parent=None):
         try:
+            config = codec_registry.get(plugin_item.plugin_type).decode(expand_config(plugin_item, self.refs), language)
             plugin = add_plugin(
                 placeholder,
                 plugin_type=plugin_item.plugin_type,
                 language=language,
                 target=parent,
-                **plugin_item.config
+                **config
             )
         except Exception as e:
             logger.exception(f'{placeholder.page.get_title()}: cannot import plugin: {plugin_item.asdict()}')
             return
+        count('plugins')
         # save id for update_internal_links
         plugin_item.id = plugin.id
 
@@ -38,89 +55,614 @@ class PluginMixin:
             self.import_plugin(placeholder, child_item, language, parent=plugin)
 
     def deserialize_value(self, value, plugin_type:str, language:str):
-        if isinstance(value, dict) and 'model' in value and 'pk' in value:
-            return get_related_object(value)
-        else:
-            return value
+        return codec_registry.get(plugin_type).decode({'value': value}, language)['value']
 
 class PlaceholderMixin(PluginMixin):
+    @instrumented('import_placeholder')
     def import_placeholder(self, content: PageContent, placeholder_item: PlaceholderItem, language: str):
-        try:
-            placeholder = content.placeholders.all().get(slot=placeholder_item.slot)
-        except ObjectDoesNotExist:
-            try:
-                placeholder = content.placeholder # alias?
-            except AttributeError:
-                logger.exception(f'{content.page.get_title()}: cannot import placeholder: {placeholder_item}')
-                return
+        placeholder = self.get_placeholder_map(content).get(placeholder_item.slot)
+        if placeholder is None and hasattr(type(content), 'placeholder'):
+            placeholder = content.placeholder # alias?
+        if placeholder is None:
+            logger.warning(f'{content}: cannot import placeholder: {placeholder_item.slot}')
+            self.unmatched_slots.append(f'{content}: {placeholder_item.slot}')
+            return
+        count('placeholders')
 
         for plugin_item in placeholder_item.plugins:
             self.import_plugin(placeholder, plugin_item, language)
 
+    @instrumented('import_plugins')
+    def bulk_import_plugins(self, placeholder: Placeholder, plugin_items: list[PluginItem], language: str):
+        """appends the plugin trees of plugin_items to placeholder: the CMSPlugin rows are inserted with one query per
+        tree level, the plugin model rows one by one (raw, unless the plugin model has its own save()).
+        """
+        # positions are enumerated in tree order over the whole placeholder
+        offset = placeholder.get_last_plugin_position(language) or 0
+        positions = {}
+        for plugin_item in plugin_items:
+            for item in plugin_item.collect_plugins():
+                positions[id(item)] = offset + len(positions) + 1
+
+        failed = False
+        level = [(plugin_item, None) for plugin_item in plugin_items]
+        while level:
+            bases = [
+                CMSPlugin(
+                    placeholder=placeholder,
+                    language=language,
+                    plugin_type=plugin_item.plugin_type,
+                    parent=parent,
+                    position=positions[id(plugin_item)],
+                )
+                for plugin_item, parent in level
+            ]
+            CMSPlugin.objects.bulk_create(bases)
+
+            next_level = []
+            for base, (plugin_item, _) in zip(bases, level):
+                try:
+                    self.create_plugin_instance(base, plugin_item, language)
+                except Exception as e:
+                    logger.exception(f'{placeholder}: cannot import plugin: {plugin_item.asdict()}')
+                    base.delete()
+                    failed = True
+                    continue
+                count('plugins')
+                # save id for update_internal_links
+                plugin_item.id = base.pk
+                next_level.extend((child_item, base) for child_item in plugin_item.children)
+            level = next_level
+
+        if failed:
+            placeholder._recalculate_plugin_positions(language)
+
+    def create_plugin_instance(self, base: CMSPlugin, plugin_item: PluginItem, language: str) -> CMSPlugin:
+        model = plugin_pool.get_plugin(plugin_item.plugin_type).model
+        if model._meta.concrete_model is CMSPlugin:
+            return base
+
+        config = codec_registry.get(plugin_item.plugin_type).decode(expand_config(plugin_item, self.refs), language)
+        instance = model(**config)
+        base.set_base_attr(instance)
+        if model.save is models.Model.save:
+            # the CMSPlugin row exists already, only the plugin model row is inserted
+            instance.save_base(raw=True, force_insert=True)
+        else:
+            instance.save()
+        return instance
+
+    def get_placeholder_map(self, content) -> dict[str, Placeholder]:
+        """slot -> placeholder of all declared slots of content, existing placeholders are loaded with one query,
+        missing ones are created.
+        """
+        if not hasattr(content, '_placeholder_map'):
+            content._placeholder_map = rescan_placeholders_for_obj(content)
+        return content._placeholder_map
+
+
+class ContentMixin(PlaceholderMixin):
+    def create_versions(self, contents: list):
+        """creates the initial draft versions of newly created content objs. Version.save() numbers and locks the
+        version, runs on_draft_create and sends the version operation signals, so versions are not bulk created.
+        """
+        from djangocms_versioning.models import Version
+
+        for content in contents:
+            Version.objects.create(content=content, created_by=self.user)
+
+    def bulk_create_placeholders(self, contents: list):
+        """creates the placeholders of newly created content objs with one query and caches them on the contents.
+        """
+        placeholders = []
+        for content in contents:
+            content_placeholders = [Placeholder(slot=slot, source=content) for slot in self.get_content_slots(content)]
+            self.set_placeholder_cache(content, content_placeholders)
+            placeholders.extend(content_placeholders)
+        Placeholder.objects.bulk_create(placeholders)
+
+    def get_content_slots(self, content) -> list[str]:
+        return [placeholder.slot for placeholder in get_declared_placeholders_for_obj(content)]
+
+    def set_placeholder_cache(self, content, placeholders: list[Placeholder]):
+        content._placeholder_cache = placeholders
+        content._placeholder_map = {placeholder.slot: placeholder for placeholder in placeholders}
+
 
 # PageImporter
 # ------------
-class PageImporter(PlaceholderMixin):
-    def __init__(self, page_item: PageItem, user, parent: Page=None):
+class PageImporter(ContentMixin):
+    def __init__(self, page_item: PageItem, user, parent: Page=None, sync=False, checkpoint: dict=None,
+                 on_checkpoint=None):
         self.page_item = page_item
-        self.user = user # needed for create_page_content (versioned PageContent)
+        self.refs = page_item.refs if page_item else {}
+        self.user = user # needed for versioned PageContent
         self.parent = parent
+        self.sync = sync # update matching existing pages instead of creating new ones
+        self.checkpoint = checkpoint # imports in resumable chunks if given, see exec_checkpointed_import
+        self.on_checkpoint = on_checkpoint # called with the checkpoint in the transaction of each chunk
+        self.unmatched_slots = []
+        self.imported = [] # (page, page_item) of all imported pages
 
+    @instrumented('exec_import')
     def exec_import(self) -> Page:
+        if self.checkpoint is not None:
+            return self.exec_checkpointed_import()
+
+        if self.sync:
+            page = self.find_page()
+            if page:
+                return self.exec_sync_import(page)
+
+        if self.can_bulk_import():
+            return self.exec_bulk_import()
+
         page = self.create_page(self.page_item)
 
-        for idx, content_item in enumerate(self.page_item.page_contents):
-            # first pagecontent is created with create_page
-            pc = page.pagecontent_set.first() if idx == 0 else None
-            self.import_page_content(page, content_item, pc)
+        # first pagecontent is created with create_page
+        content_items = self.page_item.page_contents
+        contents = list(page.pagecontent_set.all()[:1]) + self.create_page_contents(page, content_items[1:])
+        for content, content_item in zip(contents, content_items):
+            self.import_page_content(page, content_item, content)
+        self.imported.append((page, self.page_item))
 
         for child_item in self.page_item.pages:
-            PageImporter(child_item, self.user, parent=page).exec_import()
+            child_importer = PageImporter(child_item, self.user, parent=page)
+            child_importer.refs = self.refs # ref table of the root item
+            child_importer.exec_import()
+            self.unmatched_slots.extend(child_importer.unmatched_slots)
+            self.imported.extend(child_importer.imported)
 
         return page
 
+    def can_bulk_import(self) -> bool:
+        """bulk insert needs a treebeard materialized path tree, pks returned from bulk inserts and no reverse_id
+        conflicts (create_page raises for these).
+        """
+        if not issubclass(Page, MP_Node) or not connection.features.can_return_rows_from_bulk_insert:
+            return False
+
+        reverse_ids = [p.reverse_id for p in self.page_item.collect_pages() if p.reverse_id]
+        if reverse_ids and Page.objects.filter(reverse_id__in=reverse_ids, site=self.get_site()).exists():
+            return False
+        return True
+
+    def exec_bulk_import(self) -> Page:
+        """inserts the whole page item tree in bulk, page contents are imported afterwards top down, so that
+        parent urls exist when child urls are built.
+        """
+        with transaction.atomic():
+            pages = self.bulk_create_pages()
+
+        for page, page_item in pages:
+            contents = self.create_page_contents(page, page_item.page_contents)
+            for content, content_item in zip(contents, page_item.page_contents):
+                self.import_page_content(page, content_item, content)
+        self.imported.extend(pages)
+
+        return pages[0][0]
+
+    @instrumented('create_pages')
+    def bulk_create_pages(self) -> list[tuple[Page, PageItem]]:
+        """creates the tree nodes level by level (one insert per tree level) with precomputed path, depth and
+        numchild.
+
+        Returns:
+            list[tuple[Page, PageItem]]: created pages with their items, parents before children
+        """
+        site = self.get_site()
+        username = get_clean_username(self.user) if self.user else 'python-api'
+
+        pages = []
+        level = [(self.page_item, self.parent, self.get_next_path())]
+        while level:
+            level_pages = [
+                Page(
+                    parent=parent,
+                    site=site,
+                    created_by=username,
+                    changed_by=username,
+                    reverse_id=page_item.reverse_id or None,
+                    path=path,
+                    depth=len(path) // Page.steplen,
+                    numchild=len(page_item.pages),
+                )
+                for page_item, parent, path in level
+            ]
+            Page.objects.bulk_create(level_pages)
+            count('pages', len(level_pages))
+
+            next_level = []
+            for page, (page_item, _, _) in zip(level_pages, level):
+                pages.append((page, page_item))
+                for idx, child_item in enumerate(page_item.pages):
+                    child_path = Page._get_path(page.path, page.depth + 1, idx + 1)
+                    next_level.append((child_item, page, child_path))
+            level = next_level
+
+        if self.parent:
+            Page.objects.filter(pk=self.parent.pk).update(numchild=F('numchild') + 1)
+            self.parent.numchild += 1
+
+        return pages
+
+    def get_next_path(self) -> str:
+        """path of a new last child of self.parent (or new last root node)
+        """
+        if self.parent:
+            last = self.parent.get_last_child()
+            return last._inc_path() if last else Page._get_path(self.parent.path, self.parent.depth + 1, 1)
+
+        last = Page.get_last_root_node()
+        return last._inc_path() if last else Page._get_path(None, 1, 1)
+
+    def get_site(self) -> Site:
+        return self.parent.site if self.parent else Site.objects.get_current()
+
+    @instrumented('create_pages')
     def create_page(self, page_item: PageItem) -> Page:
-        language = page_item.page_contents[0].language if len(page_item.page_contents) else page_item.languages[0]
+        content_item = page_item.page_contents[0] if len(page_item.page_contents) else None
+        language = content_item.language if content_item else page_item.languages[0]
         page = create_page(
             title=page_item.title,
             template=page_item.template,
             language=language,
+            slug=(content_item.slug if content_item else None) or None,
             parent=self.parent,
             in_navigation=page_item.in_navigation,
             reverse_id=page_item.reverse_id,
+            created_by=self.user or 'python-api',  # a user creates the version of versioned contents
         )
+        count('pages')
         return page
 
+    @instrumented('create_contents')
+    def create_page_contents(self, page: Page, content_items: list[PageContentItem]) -> list[PageContent]:
+        """inserts the page contents of all languages with one query, followed by their versions (versioned
+        PageContent) or page urls and placeholders.
+        """
+        if not content_items:
+            return []
+
+        username = get_clean_username(self.user) if self.user else 'python-api'
+        contents = [
+            PageContent(
+                page=page,
+                language=content_item.language,
+                created_by=username,
+                changed_by=username,
+                **self.get_content_fields(content_item),
+            )
+            for content_item in content_items
+        ]
+        PageContent.objects.bulk_create(contents)
+        count('contents', len(contents))
+
+        if self.is_versioned(PageContent):
+            # urls of versioned contents are created on publish
+            self.create_versions(contents)
+        else:
+            self.bulk_create_urls(page, content_items)
+
+        self.bulk_create_placeholders(contents)
+        return contents
+
+    def get_content_fields(self, content_item: PageContentItem) -> dict:
+        return dict(
+            title=content_item.title,
+            slug=content_item.slug or slugify(content_item.title),
+            menu_title=content_item.menu_title or None,
+            page_title=content_item.page_title or None,
+            meta_description=content_item.meta_description or None,
+            in_navigation=content_item.in_navigation,
+            template=content_item.template or constants.TEMPLATE_INHERITANCE_MAGIC,
+        )
+
+    def bulk_create_urls(self, page: Page, content_items: list[PageContentItem]):
+        urls = []
+        for content_item in content_items:
+            slug = content_item.slug or slugify(content_item.title)
+            url_data = page.get_url_data(slug, None, content_item.language)
+            urls.append(PageUrl(page=page, language=content_item.language, site_id=page.site_id, **url_data))
+        PageUrl.objects.bulk_create(urls)
+
+        # child pages build their paths from this cache
+        page.urls_cache = {url.language: url for url in urls}
+
+    def is_versioned(self, content_model) -> bool:
+        if not apps.is_installed('djangocms_versioning'):
+            return False
+
+        from djangocms_versioning import versionables
+        return versionables.exists_for_content(content_model)
+
     def import_page_content(self, page: Page, content_item: PageContentItem, content=None):
         if not content:
-            content = create_page_content(
-                content_item.language,
-                content_item.title,
-                page,
-                content_item.slug,
-                page_title=content_item.page_title,
-                meta_description=content_item.meta_description,
-                in_navigation=content_item.in_navigation,
-                template=content_item.template,
-                created_by=self.user
-            )
+            content = self.create_page_contents(page, [content_item])[0]
 
         for placeholder_item in content_item.placeholders:
             self.import_placeholder(content, placeholder_item, content_item.language)
 
+    # Sync
+    # ----
+    def find_page(self) -> Page:
+        """existing page matching self.page_item by reverse_id or by slug below self.parent
+        """
+        site = self.get_site()
+        if self.page_item.reverse_id:
+            page = Page.objects.filter(reverse_id=self.page_item.reverse_id, site=site).first()
+            if page:
+                return page
+
+        # urls of versioned contents exist after publish only, drafts are matched by their content slug
+        siblings = self.parent.get_child_pages() if self.parent else Page.get_root_nodes().filter(site=site)
+        for content_item in self.page_item.page_contents:
+            if not content_item.slug:
+                continue
+            page = siblings.filter(
+                Q(urls__language=content_item.language, urls__slug=content_item.slug)
+                | Q(pagecontent_set__language=content_item.language, pagecontent_set__slug=content_item.slug)
+            ).first()
+            if page:
+                return page
+        return None
+
+    @instrumented('sync_pages')
+    def exec_sync_import(self, page: Page) -> Page:
+        """updates page from self.page_item, missing contents are created, existing ones updated. Child pages are
+        synced (or created if not found) recursively.
+        """
+        count('synced_pages')
+        exporter = PageExporter(page, using=DEFAULT_DB_ALIAS)
+        for content_item in self.page_item.page_contents:
+            content = page.get_admin_content(content_item.language)
+            if content:
+                self.sync_page_content(content, content_item, exporter)
+            else:
+                self.import_page_content(page, content_item)
+        self.imported.append((page, self.page_item))
+
+        for child_item in self.page_item.pages:
+            child_importer = PageImporter(child_item, self.user, parent=page, sync=True)
+            child_importer.refs = self.refs # ref table of the root item
+            child_importer.exec_import()
+            self.unmatched_slots.extend(child_importer.unmatched_slots)
+            self.imported.extend(child_importer.imported)
+
+        return page
+
+    @transaction.atomic
+    def sync_page_content(self, content: PageContent, content_item: PageContentItem, exporter: PageExporter):
+        """updates changed content fields and replaces the plugins of placeholders, whose content hash differs from
+        the current plugins. Unchanged placeholders are left alone.
+        """
+        language = content_item.language
+        placeholders = self.get_placeholder_map(content)
+        changed_items = []
+        for placeholder_item in content_item.placeholders:
+            placeholder = placeholders.get(placeholder_item.slot)
+            if placeholder is not None:
+                current_item = exporter.serialize_placeholder(placeholder, language)
+                if current_item.content_hash() == placeholder_item.content_hash(self.refs):
+                    count('unchanged_placeholders')
+                    continue
+            changed_items.append(placeholder_item)
+
+        fields = {k: v for k, v in self.get_content_fields(content_item).items() if getattr(content, k) != v}
+        if not changed_items and not fields:
+            return
+
+        content = self.get_editable_content(content)
+        if fields:
+            for name, value in fields.items():
+                setattr(content, name, value)
+            content.changed_by = get_clean_username(self.user) if self.user else 'python-api'
+            content.save(update_fields=[*fields, 'changed_by'])
+            if 'slug' in fields and not self.is_versioned(PageContent):
+                content.page.update_urls_from_content(language)
+
+        placeholders = self.get_placeholder_map(content)
+        for placeholder_item in changed_items:
+            if placeholder_item.slot in placeholders:
+                placeholders[placeholder_item.slot].clear(language)
+                count('changed_placeholders')
+            self.import_placeholder(content, placeholder_item, language)
+
+    def get_editable_content(self, content: PageContent) -> PageContent:
+        """content or, if versioned and not a draft, a new draft copy of it
+        """
+        if not self.is_versioned(PageContent):
+            return content
+
+        from djangocms_versioning.constants import DRAFT
+        from djangocms_versioning.models import Version
+
+        version = Version.objects.get_for_content(content)
+        if version.state == DRAFT:
+            return content
+        return version.copy(self.user).content
+
+    # Checkpoints
+    # -----------
+    def exec_checkpointed_import(self) -> Page:
+        """imports the page tree in chunks, each committed on its own: subtrees of up to
+        CONTENT_TRANSFER_CHECKPOINT_PAGES pages at once, larger ones page by page. After each chunk the ids of its
+        pages and plugins are stored in self.checkpoint by item path ('0', '0.1', ..), so that an interrupted import
+        resumes with the first unfinished chunk. The checkpoint is cleared after the import is complete.
+        """
+        self.checkpoint.setdefault('pages', {})
+        self.checkpoint.setdefault('plugins', {})
+        page = self.import_chunk(self.page_item, self.parent, '0')
+
+        self.checkpoint.clear()
+        self.save_checkpoint()
+        return page
+
+    def import_chunk(self, page_item: PageItem, parent: Page, path: str) -> Page:
+        chunk_size = getattr(settings, 'CONTENT_TRANSFER_CHECKPOINT_PAGES', 50)
+
+        if path in self.checkpoint['pages']:
+            # imported by an earlier run, plugin ids are restored for update_internal_links
+            page = Page.objects.get(pk=self.checkpoint['pages'][path])
+            for plugin_item, plugin_id in zip(self.get_page_plugins(page_item), self.checkpoint['plugins'][path]):
+                plugin_item.id = plugin_id
+            count('resumed_pages')
+            children = page_item.pages
+        elif len(page_item.collect_pages()) <= chunk_size:
+            page = self.import_subtree(page_item, parent, path)
+            children = []
+        else:
+            page = self.import_subtree(replace(page_item, pages=[]), parent, path)
+            children = page_item.pages
+
+        for idx, child_item in enumerate(children):
+            self.import_chunk(child_item, page, f'{path}.{idx}')
+        return page
+
+    def import_subtree(self, page_item: PageItem, parent: Page, path: str) -> Page:
+        importer = PageImporter(page_item, self.user, parent=parent, sync=self.sync)
+        importer.refs = self.refs # ref table of the root item
+        paths = {id(item): item_path for item_path, item in self.get_item_paths(page_item, path)}
+        added = []
+        try:
+            # the checkpoint is saved in the transaction of the chunk, so both are committed or neither is
+            with transaction.atomic():
+                page = importer.exec_import()
+                for imported_page, imported_item in importer.imported:
+                    item_path = paths[id(imported_item)]
+                    added.append(item_path)
+                    self.checkpoint['pages'][item_path] = imported_page.pk
+                    self.checkpoint['plugins'][item_path] = [p.id for p in self.get_page_plugins(imported_item)]
+                self.save_checkpoint()
+        except Exception:
+            # rolled back chunk, it is imported again on resume
+            for item_path in added:
+                del self.checkpoint['pages'][item_path]
+                del self.checkpoint['plugins'][item_path]
+            raise
+        self.unmatched_slots.extend(importer.unmatched_slots)
+        self.imported.extend(importer.imported)
+        return page
+
+    def get_item_paths(self, page_item: PageItem, path: str):
+        yield path, page_item
+        for idx, child_item in enumerate(page_item.pages):
+            yield from self.get_item_paths(child_item, f'{path}.{idx}')
+
+    def get_page_plugins(self, page_item: PageItem) -> list[PluginItem]:
+        """plugins of the page contents of page_item (without child pages)
+        """
+        return [plugin for content_item in page_item.page_contents for plugin in content_item.collect_plugins()]
+
+    def save_checkpoint(self):
+        if self.on_checkpoint:
+            self.on_checkpoint(self.checkpoint)
+
+
+class StreamMixin:
+    """imports ndjson transfer lines unit by unit (see ndjson.iter_units), so that only a group of contents
+    (CONTENT_TRANSFER_STREAM_REF_CONTENTS, default 20) with their placeholders and plugins is held in memory at a
+    time. Model refs are resolved per group, plugins with internal links are kept for update_internal_links() after
+    the import.
+    """
+    def iter_units(self):
+        group_size = getattr(settings, 'CONTENT_TRANSFER_STREAM_REF_CONTENTS', 20)
+        group, n_contents = [], 0
+        for record, item in iter_units(read_records(self.lines)):
+            if record['_parent'] is None and item.refs:
+                # ref table of the root record, resolved once
+                self.refs = item.refs
+                self.model_ref_errors.extend(update_table_refs(self.refs))
+            group.append((record, item))
+            n_contents += self.is_content(item)
+            if n_contents >= group_size:
+                yield from self.resolve_units(group)
+                group, n_contents = [], 0
+        yield from self.resolve_units(group)
+
+    def resolve_units(self, group: list[tuple]):
+        """resolves the model refs of the contents in group with one lookup per model and yields the units
+        """
+        plugins = [plugin for _, item in group if self.is_content(item) for plugin in item.collect_plugins()]
+        self.model_ref_errors.extend(resolve_model_values([v for p in plugins for v in get_plugin_values(p)]))
+        self.link_plugins.extend(p for p in plugins if self.has_internal_links(p))
+        yield from group
+
+    def is_content(self, item) -> bool:
+        return item.type in ('pagecontent', 'aliascontent')
+
+    def has_internal_links(self, plugin_item: PluginItem) -> bool:
+        config = plugin_item.config.get('_json')
+        return isinstance(config, dict) and any(isinstance(v, dict) and 'internal_link' in v for v in config.values())
+
+    @instrumented('update_internal_links')
+    def update_internal_links(self) -> list[str]:
+        """updates the internal links of the imported plugins, must be called after exec_import.
+        """
+        errors = []
+        resolved = {}
+        for plugin_item in self.link_plugins:
+            errors.extend(plugin_item.update_internal_links(self.refs, resolved))
+        return errors
+
+
+class PageStreamImporter(StreamMixin, PageImporter):
+    def __init__(self, lines: Iterable, user, parent: Page=None):
+        super().__init__(None, user, parent=parent)
+        self.lines = lines
+        self.model_ref_errors = []
+        self.link_plugins = []
+
+    @instrumented('exec_import')
+    def exec_import(self) -> Page:
+        pages = {}  # record id -> Page
+        for record, item in self.iter_units():
+            if item.type == 'page':
+                parent = pages[record['_parent']] if record['_parent'] else self.parent
+                pages[record['_id']] = self.create_page_node(item, parent)
+            else:
+                self.import_page_content(pages[record['_parent']], item)
+
+        return next(iter(pages.values()), None)
+
+    @instrumented('create_pages')
+    def create_page_node(self, page_item: PageItem, parent: Page=None) -> Page:
+        """creates the tree node of page_item as last child of parent, contents follow as separate records.
+        """
+        site = self.get_site()
+        if page_item.reverse_id and Page.objects.filter(reverse_id=page_item.reverse_id, site=site).exists():
+            raise FieldError(f'A page with the reverse_id="{page_item.reverse_id}" already exist.')
+
+        username = get_clean_username(self.user) if self.user else 'python-api'
+        page = Page(
+            parent=parent,
+            site=site,
+            created_by=username,
+            changed_by=username,
+            reverse_id=page_item.reverse_id or None,
+        )
+        page.add_to_tree(position='last-child')
+        count('pages')
+        return page
+
 
 # AliasImporter
 # -------------
-class AliasImporter(PlaceholderMixin):
+class AliasImporter(ContentMixin):
     def __init__(self, alias_item: AliasItem, user):
         self.alias_item = alias_item
+        self.refs = alias_item.refs if alias_item else {}
         self.user = user # needed for create_alias_content (versioned AliasContent)
+        self.unmatched_slots = []
 
+    @instrumented('exec_import')
     def exec_import(self) -> Alias:
         alias = self.create_alias(self.alias_item)
 
-        for content_item in self.alias_item.alias_contents:
-            self.import_alias_content(alias, content_item)
+        content_items = self.alias_item.alias_contents
+        contents = self.create_alias_contents(alias, content_items)
+        for content, content_item in zip(contents, content_items):
+            self.import_alias_content(alias, content_item, content)
 
         return alias
 
@@ -134,16 +676,99 @@ class AliasImporter(PlaceholderMixin):
             category=category
         )
 
-    def import_alias_content(self, alias: Alias, content_item: AliasContentItem):
-        content = AliasContent.objects.create(
-            alias=alias,
-            name=content_item.name,
-            language=content_item.language,
-        )
+    @instrumented('create_contents')
+    def create_alias_contents(self, alias: Alias, content_items: list[AliasContentItem]) -> list[AliasContent]:
+        """inserts the alias contents of all languages with one query, followed by their versions and placeholders.
+        """
+        if not content_items:
+            return []
+
+        contents = [
+            AliasContent(alias=alias, name=content_item.name, language=content_item.language)
+            for content_item in content_items
+        ]
+        AliasContent.objects.bulk_create(contents)
+        count('contents', len(contents))
 
         if is_versioning_enabled():
-            from djangocms_versioning.models import Version
-            Version.objects.create(content=content, created_by=self.user)
+            self.create_versions(contents)
+
+        self.bulk_create_placeholders(contents)
+        return contents
+
+    def get_content_slots(self, content: AliasContent) -> list[str]:
+        return [content.alias.static_code or content.placeholder_slotname]
+
+    def set_placeholder_cache(self, content: AliasContent, placeholders: list[Placeholder]):
+        placeholders[0].source = content
+        content.placeholder = placeholders[0]  # cached_property
+        content._placeholder_map = {placeholders[0].slot: placeholders[0]}
+
+    def import_alias_content(self, alias: Alias, content_item: AliasContentItem, content=None):
+        if not content:
+            content = self.create_alias_contents(alias, [content_item])[0]
 
         for placeholder_item in content_item.placeholders:
             self.import_placeholder(content, placeholder_item, content_item.language)
+
+
+class AliasStreamImporter(StreamMixin, AliasImporter):
+    def __init__(self, lines: Iterable, user):
+        super().__init__(None, user)
+        self.lines = lines
+        self.model_ref_errors = []
+        self.link_plugins = []
+
+    @instrumented('exec_import')
+    def exec_import(self) -> Alias:
+        alias = None
+        for record, item in self.iter_units():
+            if item.type == 'alias':
+                alias = self.create_alias(item)
+            else:
+                self.import_alias_content(alias, item)
+
+        return alias
+
+
+# PlaceholderImporter
+# -------------------
+class PlaceholderImporter(PlaceholderMixin):
+    def __init__(self, placeholder_item: PlaceholderItem, user, placeholder: Placeholder=None, language: str=None):
+        """imports the plugins into placeholder or, if not given, into the clipboard of user.
+        """
+        self.placeholder_item = placeholder_item
+        self.refs = placeholder_item.refs
+        self.user = user
+        self.placeholder = placeholder
+        self.language = language or settings.LANGUAGE_CODE
+        self.unmatched_slots = []
+
+    @instrumented('exec_import')
+    def exec_import(self) -> Placeholder:
+        with transaction.atomic():
+            placeholder = self.placeholder or self.get_clipboard()
+            self.bulk_import_plugins(placeholder, self.placeholder_item.plugins, self.language)
+        return placeholder
+
+    def get_clipboard(self) -> Placeholder:
+        """clears the clipboard of self.user and returns the placeholder of a new placeholder reference in it, like
+        the placeholder "Copy all" action does. So the plugins can be pasted into any placeholder.
+        """
+        user_settings = UserSettings.objects.select_related('clipboard').filter(user=self.user).first()
+        if user_settings is None:
+            clipboard = Placeholder.objects.create(slot='clipboard')
+            user_settings = UserSettings.objects.create(clipboard=clipboard, language=self.language, user=self.user)
+            clipboard.source = user_settings
+            clipboard.save()
+        clipboard = user_settings.clipboard
+        clipboard.clear()
+
+        reference = PlaceholderReference.objects.create(
+            name=self.placeholder_item.slot,
+            plugin_type='PlaceholderPlugin',
+            language=self.language,
+            placeholder=clipboard,
+            position=1,
+        )
+        return reference.placeholder_ref
@@ -0,0 +1,157 @@
+"""Per phase profiling of transfers.
+
+A TransferProfile is activated around an admin action (or any other code running exporters/importers). While active,
+every `phase()` block records wall time, db query count and time, peak traced memory and counts of processed
+objects. Phases outside of an active profile cost nothing but a context var lookup.
+
+    with TransferProfile().activate() as profile:
+        PageExporter(page).export()
+    obj.stats['export'] = profile.asdict()
+"""
+import logging
+import time
+import tracemalloc
+from contextlib import contextmanager, ExitStack
+from contextvars import ContextVar
+from functools import wraps
+
+from django.db import connections
+from django.dispatch import Signal
+
+logger = logging.getLogger(__name__)
+
+# sent after each finished phase with kwargs: profile, phase, stats
+phase_finished = Signal()
+
+_active_profile = ContextVar('cmstransfer_profile', default=None)
+
+
+class QueryCounter:
+    """connection.execute_wrapper which sums up queries and their time.
+    """
+    def __init__(self):
+        self.count = 0
+        self.time = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.count += 1
+            self.time += time.perf_counter() - start
+
+
+class TransferProfile:
+    def __init__(self, trace_memory=True):
+        self.trace_memory = trace_memory
+        self.phases = {}
+        self.queries = QueryCounter()
+        self._stack = []  # active phases
+
+    @contextmanager
+    def activate(self):
+        token = _active_profile.set(self)
+        started_tracing = self.trace_memory and not tracemalloc.is_tracing()
+        if started_tracing:
+            tracemalloc.start()
+        try:
+            with ExitStack() as stack:
+                for alias in connections:
+                    stack.enter_context(connections[alias].execute_wrapper(self.queries))
+                yield self
+        finally:
+            if started_tracing:
+                tracemalloc.stop()
+            _active_profile.reset(token)
+
+    @contextmanager
+    def phase(self, name: str):
+        if any(entry['name'] == name for entry in self._stack):
+            # reentrant phase, e.g. recursive exec_import, is measured by the outermost call
+            yield
+            return
+
+        if self._stack:
+            # memory peak of the outer phase until now
+            outer = self._stack[-1]
+            outer['peak'] = max(outer['peak'], self._pop_peak())
+        else:
+            self._pop_peak()
+
+        entry = {
+            'name': name, 'start': time.perf_counter(), 'queries': self.queries.count,
+            'query_time': self.queries.time, 'peak': 0, 'objects': {},
+        }
+        self._stack.append(entry)
+        try:
+            yield
+        finally:
+            self._stack.pop()
+            peak = max(entry['peak'], self._pop_peak())
+            if self._stack:
+                self._stack[-1]['peak'] = max(self._stack[-1]['peak'], peak)
+
+            stats = self.phases.setdefault(name, {
+                'calls': 0, 'wall_time': 0.0, 'queries': 0, 'query_time': 0.0, 'peak_memory': 0, 'objects': {},
+            })
+            stats['calls'] += 1
+            stats['wall_time'] = round(stats['wall_time'] + time.perf_counter() - entry['start'], 6)
+            stats['queries'] += self.queries.count - entry['queries']
+            stats['query_time'] = round(stats['query_time'] + self.queries.time - entry['query_time'], 6)
+            stats['peak_memory'] = max(stats['peak_memory'], peak)
+            for key, n in entry['objects'].items():
+                stats['objects'][key] = stats['objects'].get(key, 0) + n
+
+            logger.debug(f'transfer phase {name}: {stats}')
+            phase_finished.send(sender=self.__class__, profile=self, phase=name, stats=stats)
+
+    def _pop_peak(self) -> int:
+        """returns the traced memory peak since the last call and resets it.
+        """
+        if not tracemalloc.is_tracing():
+            return 0
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.reset_peak()
+        return peak
+
+    def count(self, key: str, n: int = 1):
+        for entry in self._stack:
+            entry['objects'][key] = entry['objects'].get(key, 0) + n
+
+    def asdict(self) -> dict:
+        return {name: dict(stats, objects=dict(stats['objects'])) for name, stats in self.phases.items()}
+
+
+def get_active_profile() -> TransferProfile:
+    return _active_profile.get()
+
+
+@contextmanager
+def phase(name: str):
+    profile = _active_profile.get()
+    if profile is None:
+        yield
+        return
+    with profile.phase(name):
+        yield
+
+
+def instrumented(name: str):
+    """decorator running the decorated function as phase name.
+    """
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with phase(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def count(key: str, n: int = 1):
+    """counts n processed objects of kind key in all active phases.
+    """
+    profile = _active_profile.get()
+    if profile is not None:
+        profile.count(key, n)
@@ -1,12 +1,17 @@
 from cms.models import Page
-from dataclasses import dataclass, field, asdict, fields, is_dataclass
+from dataclasses import dataclass, field, asdict, fields, is_dataclass, MISSING
+from functools import cache
 from re import I
 from typing import get_origin, get_args, Type, TypeVar, Dict, Any, List, get_type_hints
-from .serializers import search_related_objects, get_object_by_abs_url
+from .instrumentation import instrumented, count
+from .preflight import preflight, Plan
+from .refs import collect_refs, collect_model_values, expand_config, get_plugin_values, get_ref, resolve_model_values
+from .serializers import JsonEncoder, get_object_by_abs_url
 
 from django.core.exceptions import ObjectDoesNotExist
 from cmsplus.models import PlusItem
 
+import hashlib
 import json
 
 T = TypeVar('T', bound='TransferItem')
@@ -26,10 +31,12 @@ class TransferItem:
     def collect_plugins(self) -> List['PluginItem']:
         return []
 
+    @instrumented('asdict')
     def asdict(self):
-        return asdict(self)
+        return asdict(self, dict_factory=item_dict)
 
     @classmethod
+    @instrumented('from_dict')
     def from_dict(cls: Type[T], data: Dict[str, Any]) -> T:
         init_data = {}
 
@@ -37,6 +44,8 @@ class TransferItem:
         type_hints = get_type_hints(cls)
 
         for f in fields(cls):
+            if f.name not in data and f.default_factory is not MISSING:
+                continue  # e.g. refs, which are written only on the top level item
             value = data.get(f.name)
             field_type = type_hints[f.name]  # not f.type! which is "'Plugin'"
             origin = get_origin(field_type)
@@ -57,6 +66,86 @@ class TransferItem:
 
         return cls(**init_data)
 
+    @classmethod
+    def lazy(cls: Type[T], data: Dict[str, Any]) -> T:
+        """a lazy view of the item over data (see LazyItem), e.g. over the stored data of a transfer model.
+        """
+        return lazy_class(cls).wrap(data)
+
+
+class LazyItem:
+    """Mixin for lazy views of transfer items over their dict: fields are read from and written to the dict, list
+    fields become (lazy) child items only when accessed. asdict() returns the dict itself, so untouched subtrees are
+    not converted again.
+    """
+    def __init__(self, *args, **kwargs):
+        object.__setattr__(self, '_data', {})
+        object.__setattr__(self, '_lists', {})
+        super().__init__(*args, **kwargs)
+
+    @classmethod
+    def wrap(cls, data: Dict[str, Any]):
+        item = cls.__new__(cls)
+        object.__setattr__(item, '_data', data)
+        object.__setattr__(item, '_lists', {})
+        return item
+
+    def asdict(self):
+        # accessed lists may have been changed, their items are lazy views sharing their dicts with _data
+        for name, items in self._lists.items():
+            self._data[name] = [item.asdict() for item in items]
+        if 'refs' in self._data and not self._data['refs']:
+            del self._data['refs']
+        return self._data
+
+
+def item_dict(pairs) -> Dict[str, Any]:
+    """dict factory for asdict(): empty ref tables are left out, only the top level item writes one.
+    """
+    return {name: value for name, value in pairs if name != 'refs' or value}
+
+
+def lazy_field(f) -> property:
+    def fget(self):
+        if f.name not in self._data:
+            if f.default_factory is MISSING:
+                return None if f.default is MISSING else f.default
+            # e.g. config: store it, so that changes are kept
+            self._data[f.name] = f.default_factory()
+        return self._data[f.name]
+
+    def fset(self, value):
+        self._data[f.name] = value
+
+    return property(fget, fset)
+
+
+def lazy_list_field(f, item_type: Type[TransferItem]) -> property:
+    def fget(self):
+        if f.name not in self._lists:
+            self._lists[f.name] = [item_type.lazy(data) for data in self._data.get(f.name) or []]
+        return self._lists[f.name]
+
+    def fset(self, value):
+        self._lists[f.name] = value
+
+    return property(fget, fset)
+
+
+@cache
+def lazy_class(cls: Type[T]) -> Type[T]:
+    """the lazy view class of the item class cls
+    """
+    type_hints = get_type_hints(cls)
+    namespace = {}
+    for f in fields(cls):
+        field_type = type_hints[f.name]
+        if get_origin(field_type) is list and issubclass(get_args(field_type)[0], TransferItem):
+            namespace[f.name] = lazy_list_field(f, get_args(field_type)[0])
+        else:
+            namespace[f.name] = lazy_field(f)
+    return type(f'Lazy{cls.__name__}', (LazyItem, cls), namespace)
+
 
 @dataclass
 class PluginItem(TransferItem):
@@ -71,31 +160,31 @@ class PluginItem(TransferItem):
             plugins.extend(child.collect_plugins())
         return plugins
 
+    def hash_data(self, refs: dict = None) -> dict:
+        """plugin type, config (with expanded refs) and children without db ids
+        """
+        return {
+            'plugin_type': self.plugin_type,
+            'config': expand_config(self, refs),
+            'children': [child.hash_data(refs) for child in self.children],
+        }
+
     def update_model_refs(self) -> list[str]:
-        """queries all model refs in config and updates pks. 
+        """queries all model refs in config and updates pks. Refs in the ref table are updated by the top level item.
 
         Returns:
             list[str]: errors - list of model_values where no db obj can be found
         """
-        errors = []
-        config = self.config if not '_json' in self.config else self.config.get('_json')
-        mdl_values = [v for v in config.values() if isinstance(v, dict) and 'model' in v]
-        for mdl_value in mdl_values:
-            objs = search_related_objects(mdl_value, self.plugin_type)
-            if not objs:
-                errors.append(mdl_value.copy())
-            elif 'pk' in mdl_value:
-                obj = objs[0]
-                mdl_value['pk'] = obj.pk if obj else None
-            else:
-                mdl_value['p_keys'] = [obj.pk for obj in objs]
+        return resolve_model_values(get_plugin_values(self))
 
-        return errors
-
-    def update_internal_links(self) -> list[str]:
+    def update_internal_links(self, refs: dict = None, resolved: dict = None) -> list[str]:
         """queries all internal links in config and updates replaces abs_url with pk.
         Must not be called befor import or self.plugin must exist
 
+        Args:
+            refs (dict): ref table of the top level item, resolved links are updated there once for all plugins
+            resolved (dict): cache link -> db obj (or None) shared by the plugins of an item
+
         Returns:
             list[str]: errors - list of model_values where no db obj can be found
         """
@@ -118,24 +207,37 @@ class PluginItem(TransferItem):
             # plugin no longer exists, so nothing to do
             return errors
 
+        resolved = {} if resolved is None else resolved
         config = plugin.config
         link_items = [(k, v) for k, v in config.items() if isinstance(v, dict) and 'internal_link' in v]
+        count('internal_links', len(link_items))
         for key, link_value in link_items:
             # import values must be gotten from import item config
             import_link_value = self.config['_json'][key]
-            mdl_str, abs_url = import_link_value['internal_link'].split(':')
+            ref_key = get_ref(import_link_value['internal_link'])
+            link = refs[ref_key] if ref_key else import_link_value['internal_link']
+            mdl_str, abs_url = link.split(':')
             if not abs_url.startswith('/'):
+                if ref_key and link_value['internal_link'] != link:
+                    # table entry resolved already for another plugin
+                    link_value['internal_link'] = link
+                    plugin.save()
                 continue # update already done
-            obj = get_object_by_abs_url(mdl_str, abs_url)
+            if link not in resolved:
+                resolved[link] = get_object_by_abs_url(mdl_str, abs_url)
+            obj = resolved[link]
             if not obj:
-                errors.append(import_link_value.copy())
+                errors.append({**import_link_value, 'internal_link': link})
                 link_value['internal_link'] = f'cms.page:{backup_page.pk}'
                 # create data attribute with absolute url for later fixing
-                plugin.config['attributes'][f'data-link-{key}'] = json.dumps(import_link_value)
+                plugin.config['attributes'][f'data-link-{key}'] = json.dumps({**import_link_value, 'internal_link': link})
             else:
                 link_value['internal_link'] = f'{mdl_str}:{obj.pk}'
-                # also update import_link_value to avoid fixing again
-                import_link_value['internal_link'] = f'{mdl_str}:{obj.pk}'
+                # also update import_link_value (or its table entry) to avoid fixing again
+                if ref_key:
+                    refs[ref_key] = f'{mdl_str}:{obj.pk}'
+                else:
+                    import_link_value['internal_link'] = f'{mdl_str}:{obj.pk}'
             plugin.save()
 
         return errors
@@ -145,6 +247,7 @@ class PluginItem(TransferItem):
 class PlaceholderItem(TransferItem):
     slot: str
     extra_context: Dict[str, Any] = field(default_factory=dict)
+    refs: Dict[str, Any] = field(default_factory=dict)
     plugins: List[PluginItem] = field(default_factory=list)
 
     def collect_plugins(self) -> List[PluginItem]:
@@ -153,6 +256,39 @@ class PlaceholderItem(TransferItem):
             plugins.extend(plugin.collect_plugins())
         return plugins
 
+    def content_hash(self, refs: dict = None) -> str:
+        """sha1 of the plugin trees, equal for equal plugin types, configs and structure. refs is the ref table of
+        the top level item, if the placeholder is part of a page or alias.
+        """
+        data = [plugin.hash_data(self.refs or refs) for plugin in self.plugins]
+        return hashlib.sha1(json.dumps(data, cls=JsonEncoder, sort_keys=True).encode()).hexdigest()
+
+    def preflight(self) -> Plan:
+        """checks the import of the plugins without writing (see preflight.py): plugin types, model refs and links.
+        """
+        return preflight(self)
+
+    def collect_refs(self) -> dict:
+        """moves the model refs and internal links of all plugins into the ref table (see refs.py).
+        """
+        return collect_refs(self)
+
+    @instrumented('update_model_refs')
+    def update_model_refs(self) -> list[str]:
+        """updates the model refs of the ref table once and the inline refs of all plugins, batched per model.
+        """
+        return resolve_model_values(collect_model_values(self))
+
+    @instrumented('update_internal_links')
+    def update_internal_links(self) -> list[str]:
+        """collects all plugins and updates there internal links, each link is resolved once.
+        """
+        errors = []
+        resolved = {}
+        for plugin in self.collect_plugins():
+            errors.extend(plugin.update_internal_links(self.refs, resolved))
+        return errors
+
 @dataclass
 class PageContentItem(TransferItem):
     language: str
@@ -181,6 +317,7 @@ class PageItem(TransferItem):
     languages: List[str] = field(default_factory=list)
     page_contents: List[PageContentItem] = field(default_factory=list)
     pages: List['PageItem'] = field(default_factory=list)
+    refs: Dict[str, Any] = field(default_factory=dict)
 
     def collect_plugins(self) -> List[PluginItem]:
         plugins = []
@@ -190,20 +327,37 @@ class PageItem(TransferItem):
             plugins.extend(subpage.collect_plugins())
         return plugins
 
+    def collect_pages(self) -> List['PageItem']:
+        pages = [self]
+        for subpage in self.pages:
+            pages.extend(subpage.collect_pages())
+        return pages
+
+    def preflight(self, check_reverse_ids=True, site=None, parent: Page = None) -> Plan:
+        """checks the import of the page tree below parent without writing (see preflight.py), reverse ids must not
+        exist on site (default: the current site) if check_reverse_ids.
+        """
+        return preflight(self, check_reverse_ids=check_reverse_ids, site=site, parent=parent)
+
+    def collect_refs(self) -> dict:
+        """moves the model refs and internal links of all plugins into the ref table (see refs.py).
+        """
+        return collect_refs(self)
+
+    @instrumented('update_model_refs')
     def update_model_refs(self) -> list[str]:
-        """collects all plugins and updates there model refs.
+        """updates the model refs of the ref table once and the inline refs of all plugins, batched per model.
         """
-        errors = []
-        for plugin in self.collect_plugins():
-            errors.extend(plugin.update_model_refs())
-        return errors
+        return resolve_model_values(collect_model_values(self))
 
+    @instrumented('update_internal_links')
     def update_internal_links(self) -> list[str]:
-        """collects all plugins and updates there internal links.
+        """collects all plugins and updates there internal links, each link is resolved once.
         """
         errors = []
+        resolved = {}
         for plugin in self.collect_plugins():
-            errors.extend(plugin.update_internal_links())
+            errors.extend(plugin.update_internal_links(self.refs, resolved))
         return errors
 
 @dataclass
@@ -225,6 +379,7 @@ class AliasItem(TransferItem):
     category: str
     languages: List[str] = field(default_factory=list)
     alias_contents: List[AliasContentItem] = field(default_factory=list)
+    refs: Dict[str, Any] = field(default_factory=dict)
 
     def collect_plugins(self) -> List[PluginItem]:
         plugins = []
@@ -232,18 +387,28 @@ class AliasItem(TransferItem):
             plugins.extend(content.collect_plugins())
         return plugins
 
+    def preflight(self) -> Plan:
+        """checks the import of the alias without writing (see preflight.py).
+        """
+        return preflight(self)
+
+    def collect_refs(self) -> dict:
+        """moves the model refs and internal links of all plugins into the ref table (see refs.py).
+        """
+        return collect_refs(self)
+
+    @instrumented('update_model_refs')
     def update_model_refs(self) -> list[str]:
-        """collects all plugins and updates there model refs.
+        """updates the model refs of the ref table once and the inline refs of all plugins, batched per model.
         """
-        errors = []
-        for plugin in self.collect_plugins():
-            errors.extend(plugin.update_model_refs())
-        return errors
+        return resolve_model_values(collect_model_values(self))
 
+    @instrumented('update_internal_links')
     def update_internal_links(self) -> list[str]:
-        """collects all plugins and updates there internal links.
+        """collects all plugins and updates there internal links, each link is resolved once.
         """
         errors = []
+        resolved = {}
         for plugin in self.collect_plugins():
-            errors.extend(plugin.update_internal_links())
+            errors.extend(plugin.update_internal_links(self.refs, resolved))
         return errors
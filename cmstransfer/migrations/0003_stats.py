@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-19 09:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cmstransfer', '0002_aliasimport_alter_pageexport_data_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='aliasexport',
+            name='stats',
+            field=models.JSONField(blank=True, default=dict, editable=False, help_text='Profiling stats per admin action and phase.'),
+        ),
+        migrations.AddField(
+            model_name='aliasimport',
+            name='stats',
+            field=models.JSONField(blank=True, default=dict, editable=False, help_text='Profiling stats per admin action and phase.'),
+        ),
+        migrations.AddField(
+            model_name='pageexport',
+            name='stats',
+            field=models.JSONField(blank=True, default=dict, editable=False, help_text='Profiling stats per admin action and phase.'),
+        ),
+        migrations.AddField(
+            model_name='pageimport',
+            name='stats',
+            field=models.JSONField(blank=True, default=dict, editable=False, help_text='Profiling stats per admin action and phase.'),
+        ),
+    ]
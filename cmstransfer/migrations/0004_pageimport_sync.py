@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 11:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cmstransfer', '0003_stats'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='pageimport',
+            name='sync',
+            field=models.BooleanField(default=False, help_text='Updates existing pages (matched by reverse id or slug) instead of creating new ones, only placeholders with changed plugins are replaced.'),
+        ),
+    ]
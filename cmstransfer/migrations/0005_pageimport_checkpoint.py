@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 12:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cmstransfer', '0004_pageimport_sync'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='pageimport',
+            name='checkpoint',
+            field=models.JSONField(blank=True, default=dict, editable=False, help_text='Pages and plugins done by an interrupted import, the next import resumes from here.'),
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 5.2.18 on 2026-10-19 13:40
+
+import cmstransfer.serializers
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cmstransfer', '0005_pageimport_checkpoint'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PlaceholderExport',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('data', models.JSONField(blank=True, default=dict, encoder=cmstransfer.serializers.JsonEncoder)),
+                ('stats', models.JSONField(blank=True, default=dict, editable=False, help_text='Profiling stats per admin action and phase.')),
+                ('modified_at', models.DateTimeField(auto_now=True)),
+                ('language', models.CharField(blank=True, default='', help_text='Language of the plugins to export - leave blank to export all languages.', max_length=15)),
+                ('placeholder', models.ForeignKey(blank=True, help_text='Select placeholder to export - leave blank to export your clipboard.', null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='cms.placeholder')),
+            ],
+            options={
+                'verbose_name': 'Placeholder Export',
+            },
+        ),
+        migrations.CreateModel(
+            name='PlaceholderImport',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('data', models.JSONField(blank=True, default=dict, encoder=cmstransfer.serializers.JsonEncoder)),
+                ('stats', models.JSONField(blank=True, default=dict, editable=False, help_text='Profiling stats per admin action and phase.')),
+                ('modified_at', models.DateTimeField(auto_now=True)),
+                ('language', models.CharField(blank=True, default='', help_text='Language of the imported plugins - leave blank for the default language.', max_length=15)),
+                ('placeholder', models.ForeignKey(blank=True, help_text='Select target placeholder, plugins are appended - leave blank to import into your clipboard.', null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='cms.placeholder')),
+            ],
+            options={
+                'verbose_name': 'Placeholder Import',
+            },
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 5.2.18 on 2026-10-19 15:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cmstransfer', '0006_placeholderexport_placeholderimport'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='aliasexport',
+            name='digest',
+            field=models.JSONField(blank=True, default=dict, editable=False, help_text='Merkle digest of data to compare transfers (see digest.py).'),
+        ),
+        migrations.AddField(
+            model_name='aliasimport',
+            name='digest',
+            field=models.JSONField(blank=True, default=dict, editable=False, help_text='Merkle digest of data to compare transfers (see digest.py).'),
+        ),
+        migrations.AddField(
+            model_name='pageexport',
+            name='digest',
+            field=models.JSONField(blank=True, default=dict, editable=False, help_text='Merkle digest of data to compare transfers (see digest.py).'),
+        ),
+        migrations.AddField(
+            model_name='pageimport',
+            name='digest',
+            field=models.JSONField(blank=True, default=dict, editable=False, help_text='Merkle digest of data to compare transfers (see digest.py).'),
+        ),
+        migrations.AddField(
+            model_name='placeholderexport',
+            name='digest',
+            field=models.JSONField(blank=True, default=dict, editable=False, help_text='Merkle digest of data to compare transfers (see digest.py).'),
+        ),
+        migrations.AddField(
+            model_name='placeholderimport',
+            name='digest',
+            field=models.JSONField(blank=True, default=dict, editable=False, help_text='Merkle digest of data to compare transfers (see digest.py).'),
+        ),
+    ]
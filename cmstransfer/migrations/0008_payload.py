@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-19 16:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cmstransfer', '0007_digest'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='aliasimport',
+            name='payload',
+            field=models.FileField(blank=True, help_text='Upload an ndjson export (optionally gzip compressed) instead of pasting data - it is validated on upload and imported streaming.', upload_to='cmstransfer/payloads/'),
+        ),
+        migrations.AddField(
+            model_name='pageimport',
+            name='payload',
+            field=models.FileField(blank=True, help_text='Upload an ndjson export (optionally gzip compressed) instead of pasting data - it is validated on upload and imported streaming.', upload_to='cmstransfer/payloads/'),
+        ),
+    ]
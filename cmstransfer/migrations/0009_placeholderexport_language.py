@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 18:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cmstransfer', '0008_payload'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='placeholderexport',
+            name='language',
+            field=models.CharField(help_text='Language of the plugins to export, they are imported into one language.', max_length=15),
+        ),
+    ]
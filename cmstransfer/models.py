@@ -1,19 +1,57 @@
 import json
-from cms.models import Page
+import logging
+from cms.models import Page, Placeholder
 from django.db import models
 from djangocms_alias.models import Alias
+from .digest import item_digest, sha1
+from .items import PageItem, AliasItem, PlaceholderItem
 from .serializers import JsonEncoder
 
+logger = logging.getLogger(__name__)
+
 # Transfer Models
 #----------------
 
 class Transfer(models.Model):
     data = models.JSONField(encoder=JsonEncoder, blank=True, default=dict)
+    stats = models.JSONField(
+        blank=True,
+        default=dict,
+        editable=False,
+        help_text='Profiling stats per admin action and phase.'
+    )
+    digest = models.JSONField(
+        blank=True,
+        default=dict,
+        editable=False,
+        help_text='Merkle digest of data to compare transfers (see digest.py).'
+    )
     modified_at = models.DateTimeField(auto_now=True)
 
+    item_cls = None
+
     class Meta:
         abstract = True
 
+    def save(self, *args, **kwargs):
+        # the digest is rebuilt only if data changed, not on saves of stats or checkpoints
+        source = sha1(self.data)
+        if (self.digest or {}).get('source') != source:
+            self.digest = self.get_digest()
+            if self.digest:
+                # sha1 of the digested data, again as the lazy view may have filled in defaults (e.g. empty lists)
+                self.digest['source'] = sha1(self.data)
+        super().save(*args, **kwargs)
+
+    def get_digest(self) -> dict:
+        if not self.data or not self.data.get('type'):
+            return {}
+        try:
+            return item_digest(self.item_cls.lazy(self.data))
+        except (KeyError, TypeError, AttributeError) as e:
+            logger.warning(f'{self}: no digest for invalid data: {e}')
+            return {}
+
 
 class PageExport(Transfer):
     page = models.ForeignKey(
@@ -28,6 +66,8 @@ class PageExport(Transfer):
         help_text='Exports selected page recursive with all child pages.'
     )
 
+    item_cls = PageItem
+
     class Meta:
         verbose_name = 'Page Export'
 
@@ -42,12 +82,31 @@ class PageImport(Transfer):
         null=True,
         blank=True
     )
+    sync = models.BooleanField(
+        default=False,
+        help_text='Updates existing pages (matched by reverse id or slug) instead of creating new ones, '
+                  'only placeholders with changed plugins are replaced.'
+    )
+    checkpoint = models.JSONField(
+        blank=True,
+        default=dict,
+        editable=False,
+        help_text='Pages and plugins done by an interrupted import, the next import resumes from here.'
+    )
+    payload = models.FileField(
+        upload_to='cmstransfer/payloads/',
+        blank=True,
+        help_text='Upload an ndjson export (optionally gzip compressed) instead of pasting data - it is validated on '
+                  'upload and imported streaming.'
+    )
+
+    item_cls = PageItem
 
     class Meta:
         verbose_name = 'Page Import'
 
     def __str__(self):
-        return self.data.get('title') or f'PageImport: {self.id}'
+        return PageItem.lazy(self.data).title or self.payload.name or f'PageImport: {self.id}'
 
 class AliasExport(Transfer):
     alias = models.ForeignKey(
@@ -57,23 +116,78 @@ class AliasExport(Transfer):
         help_text='Select Alias to export.'
     )
 
+    item_cls = AliasItem
+
     class Meta:
         verbose_name = 'Alias Export'
 
 
 class AliasImport(Transfer):
     name = models.CharField(max_length=100, blank=True, default='')
+    payload = models.FileField(
+        upload_to='cmstransfer/payloads/',
+        blank=True,
+        help_text='Upload an ndjson export (optionally gzip compressed) instead of pasting data - it is validated on '
+                  'upload and imported streaming.'
+    )
+
+    item_cls = AliasItem
 
     class Meta:
         verbose_name = 'Alias Import'
 
     def __str__(self):
-        return self.name or f'AliasImport: {self.id}'
+        return self.name or self.payload.name or f'AliasImport: {self.id}'
 
     def save(self, *args, **kwargs):
         if not self.name:
             try:
-                self.name = self.data['alias_contents'][0]['name']
+                self.name = AliasItem.lazy(self.data).alias_contents[0].name
             except:
                 pass
         super().save(*args, **kwargs)
+
+
+class PlaceholderExport(Transfer):
+    placeholder = models.ForeignKey(
+        Placeholder,
+        on_delete=models.CASCADE,
+        related_name='+',  # no reverse access via placeholder
+        null=True,
+        blank=True,
+        help_text='Select placeholder to export - leave blank to export your clipboard.'
+    )
+    language = models.CharField(
+        max_length=15,
+        help_text='Language of the plugins to export, they are imported into one language.'
+    )
+
+    item_cls = PlaceholderItem
+
+    class Meta:
+        verbose_name = 'Placeholder Export'
+
+
+class PlaceholderImport(Transfer):
+    placeholder = models.ForeignKey(
+        Placeholder,
+        on_delete=models.CASCADE,
+        related_name='+',  # no reverse access via placeholder
+        null=True,
+        blank=True,
+        help_text='Select target placeholder, plugins are appended - leave blank to import into your clipboard.'
+    )
+    language = models.CharField(
+        max_length=15,
+        blank=True,
+        default='',
+        help_text='Language of the imported plugins - leave blank for the default language.'
+    )
+
+    item_cls = PlaceholderItem
+
+    class Meta:
+        verbose_name = 'Placeholder Import'
+
+    def __str__(self):
+        return PlaceholderItem.lazy(self.data).slot or f'PlaceholderImport: {self.id}'
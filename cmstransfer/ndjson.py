@@ -0,0 +1,248 @@
+"""Flat, line delimited (ndjson) transfer format.
+
+Every page, content, placeholder and plugin is one json record (line) carrying its own fields plus `_id`, the
+`_parent` record id and its `_position` below the parent. Records are written depth first (parents before their
+children), so both sides can process a transfer record by record:
+
+    {"type": "header", "format": "cmstransfer-ndjson", "version": 1, "item": "page"}
+    {"type": "page", "_id": 1, "_parent": null, "_position": 0, "page_id": 3, "reverse_id": "", ...}
+    {"type": "pagecontent", "_id": 2, "_parent": 1, "_position": 0, "language": "de", "title": "Home", ...}
+    {"type": "placeholder", "_id": 3, "_parent": 2, "_position": 0, "slot": "content", "extra_context": {}}
+    {"type": "plugin", "_id": 4, "_parent": 3, "_position": 0, "plugin_type": "TextPlugin", "config": {...}}
+"""
+import gzip
+import io
+import itertools
+import json
+from dataclasses import fields, MISSING
+from typing import get_origin, get_args, get_type_hints, Iterable, Iterator, Type
+
+from .items import (
+    TransferItem, PageItem, PageContentItem, PlaceholderItem, PluginItem, AliasItem, AliasContentItem
+)
+from .serializers import JsonEncoder
+
+FORMAT = 'cmstransfer-ndjson'
+VERSION = 1
+
+ITEM_CLASSES = {
+    'page': PageItem,
+    'pagecontent': PageContentItem,
+    'placeholder': PlaceholderItem,
+    'plugin': PluginItem,
+    'alias': AliasItem,
+    'aliascontent': AliasContentItem,
+}
+
+ITEM_TYPES = {cls: item_type for item_type, cls in ITEM_CLASSES.items()}
+
+# record types which start a self-contained unit (the record with all its descendants)
+UNIT_TYPES = ('pagecontent', 'aliascontent')
+
+
+def child_fields(cls: Type[TransferItem]) -> dict[Type[TransferItem], str]:
+    """item class -> name of the list field of cls holding items of that class
+    """
+    type_hints = get_type_hints(cls)
+    children = {}
+    for f in fields(cls):
+        field_type = type_hints[f.name]
+        if get_origin(field_type) is list and issubclass(get_args(field_type)[0], TransferItem):
+            children[get_args(field_type)[0]] = f.name
+    return children
+
+
+CHILD_FIELDS = {cls: child_fields(cls) for cls in ITEM_CLASSES.values()}
+
+
+def item_record(item: TransferItem, record_id: int, parent: int = None, position: int = 0) -> dict:
+    """the record of item without its children
+    """
+    list_fields = CHILD_FIELDS[ITEM_CLASSES[item.type]].values()
+    record = {'type': item.type, '_id': record_id, '_parent': parent, '_position': position}
+    for f in fields(item):
+        if f.name != 'type' and f.name not in list_fields:
+            record[f.name] = getattr(item, f.name)
+    if not record.get('refs', True):
+        del record['refs']  # only the top level item has a ref table
+    return record
+
+
+def item_records(item: TransferItem, ids: Iterator[int], parent: int = None, position: int = 0) -> Iterator[dict]:
+    """the records of item and all its children, depth first
+    """
+    record = item_record(item, next(ids), parent, position)
+    yield record
+    for name in CHILD_FIELDS[ITEM_CLASSES[item.type]].values():
+        for idx, child in enumerate(getattr(item, name)):
+            yield from item_records(child, ids, record['_id'], idx)
+
+
+class NdjsonWriter:
+    def __init__(self, fp, item_type: str):
+        self.fp = fp
+        self.encoder = JsonEncoder(ensure_ascii=False)
+        self.ids = itertools.count(1)
+        self.write_record({'type': 'header', 'format': FORMAT, 'version': VERSION, 'item': item_type})
+
+    def write_record(self, record: dict):
+        self.fp.write(self.encoder.encode(record) + '\n')
+
+    def write(self, item: TransferItem, parent: int = None, position: int = 0) -> int:
+        """writes the record of item (without its children) and returns its record id.
+        """
+        record = item_record(item, next(self.ids), parent, position)
+        self.write_record(record)
+        return record['_id']
+
+    def write_item(self, item: TransferItem, parent: int = None, position: int = 0):
+        """writes the records of item and all its children.
+        """
+        for record in item_records(item, self.ids, parent, position):
+            self.write_record(record)
+
+
+def read_records(lines: Iterable) -> Iterator[dict]:
+    """parses ndjson lines (str or bytes) lazily, the header record is checked and skipped.
+    """
+    for line in lines:
+        if not line.strip():
+            continue
+        record = json.loads(line)
+        if record.get('type') == 'header':
+            if record.get('format') != FORMAT:
+                raise ValueError(f'unknown transfer format: {record.get("format")}')
+            continue
+        yield record
+
+
+def record_data(record: dict) -> dict:
+    return {k: v for k, v in record.items() if not k.startswith('_')}
+
+
+def build_items(records: Iterable[dict]) -> list[tuple[dict, dict]]:
+    """builds nested item dicts from records, returns the (record, item dict) pairs of all root records.
+    """
+    nodes = {}
+    roots = []
+    for record in records:
+        data = record_data(record)
+        nodes[record['_id']] = (record, data)
+        parent = nodes.get(record['_parent'])
+        if parent is None:
+            roots.append((record, data))
+            continue
+        parent_cls = ITEM_CLASSES[parent[0]['type']]
+        name = CHILD_FIELDS[parent_cls][ITEM_CLASSES[record['type']]]
+        parent[1].setdefault(name, []).append(data)
+    return roots
+
+
+def records_to_item(records: Iterable[dict]) -> TransferItem:
+    """converts records (one complete transfer) to a PageItem/AliasItem.
+    """
+    roots = build_items(records)
+    if len(roots) != 1:
+        raise ValueError(f'transfer must have exactly one root record, got {len(roots)}.')
+    record, data = roots[0]
+    return ITEM_CLASSES[record['type']].from_dict(data)
+
+
+def item_to_records(item: TransferItem) -> Iterator[dict]:
+    """converts a PageItem/AliasItem to records, the header record is not included.
+    """
+    return item_records(item, itertools.count(1))
+
+
+def iter_units(records: Iterable[dict]) -> Iterator[tuple[dict, TransferItem]]:
+    """groups records into import units: page/alias records are yielded on their own, content records together
+    with all their descendant records. Only one unit is held in memory at a time.
+
+    Yields:
+        tuple[dict, TransferItem]: the unit's root record and its item
+    """
+    unit = []
+    for record in records:
+        if record['type'] in ('placeholder', 'plugin'):
+            if not unit:
+                raise ValueError(f'{record["type"]} record {record["_id"]} outside of a content.')
+            unit.append(record)
+            continue
+
+        if unit:
+            yield unit_item(unit)
+            unit = []
+
+        if record['type'] in UNIT_TYPES:
+            unit.append(record)
+        else:
+            yield record, ITEM_CLASSES[record['type']].from_dict(record_data(record))
+
+    if unit:
+        yield unit_item(unit)
+
+
+def unit_item(unit: list[dict]) -> tuple[dict, TransferItem]:
+    (record, data), = build_items(unit)
+    return record, ITEM_CLASSES[record['type']].from_dict(data)
+
+
+def open_lines(fp) -> Iterator[str]:
+    """the lines of the (binary) file like object fp, gzip compressed files are decompressed on the fly
+    """
+    if fp.read(2) == b'\x1f\x8b':
+        fp.seek(0)
+        fp = gzip.GzipFile(fileobj=fp)
+    else:
+        fp.seek(0)
+    return io.TextIOWrapper(fp, encoding='utf-8')
+
+
+def required_fields(cls: Type[TransferItem]) -> set[str]:
+    return {f.name for f in fields(cls) if f.default is MISSING and f.default_factory is MISSING}
+
+
+def validate_records(lines: Iterable, item_type: str) -> int:
+    """validates ndjson lines record by record: only the type of every record id is kept, no items are built.
+
+    Returns:
+        int: number of records
+
+    Raises:
+        ValueError: on the first invalid record (with its line number)
+    """
+    types = {}  # record id -> record type
+    n = 0
+    try:
+        for n, record in enumerate(read_records(lines), 1):
+            validate_record(record, types, item_type)
+    except json.JSONDecodeError as e:
+        raise ValueError(f'record {n + 1}: invalid json: {e}')
+    except ValueError as e:
+        raise ValueError(f'record {n}: {e}')
+    if not types:
+        raise ValueError('no records found.')
+    return n
+
+
+def validate_record(record: dict, types: dict, item_type: str):
+    cls = ITEM_CLASSES.get(record.get('type'))
+    if cls is None:
+        raise ValueError(f'unknown record type: {record.get("type")}')
+    missing = (required_fields(cls) | {'_id', '_parent'}) - set(record)
+    if missing:
+        raise ValueError(f'{record["type"]} record without {", ".join(sorted(missing))}')
+    if record.get('_id') in types:
+        raise ValueError(f'duplicate record id: {record.get("_id")}')
+
+    parent = record.get('_parent')
+    if parent is None:
+        if types:
+            raise ValueError('transfer must have exactly one root record.')
+        if record['type'] != item_type:
+            raise ValueError(f'root record must be of type {item_type}, got {record["type"]}')
+    elif parent not in types:
+        raise ValueError(f'parent record {parent} not found (records must follow their parent).')
+    elif cls not in CHILD_FIELDS[ITEM_CLASSES[types[parent]]]:
+        raise ValueError(f'{record["type"]} record below {types[parent]} record {parent}')
+    types[record['_id']] = record['type']
@@ -0,0 +1,180 @@
+"""Per plugin type codecs, which serialize plugin instances to config dicts (export) and back to add_plugin kwargs
+(import).
+
+The codec of a plugin type is built once from its plugin class (field list and value en-/decoders) and looked up
+by plugin type afterwards. Custom encoders and decoders can be registered per plugin type:
+
+    from cmstransfer.plugin_codecs import registry
+
+    def encode_map(instance, exporter):
+        return {'lat': float(instance.lat), 'lng': float(instance.lng)}
+
+    registry.register('MapPlugin', encoder=encode_map)
+"""
+from cms.plugin_pool import plugin_pool
+from cmsplus.models import PlusItem
+from django import forms
+from djangocms_text.models import Text as TextPlugin
+
+from .serializers import JsonEncoder, get_related_object
+
+PRIMITIVES = (str, int, float, bool, type(None))
+
+# version of the encoded configs, bump it if codecs change their output (invalidates cached placeholder fragments)
+CODEC_VERSION = 2
+
+_json_encoder = JsonEncoder()
+
+
+def encode_value(value):
+    """serializes a plugin field value, primitives are returned as they are.
+    """
+    if isinstance(value, PRIMITIVES):
+        return value
+    elif isinstance(value, (list, tuple)):
+        return [encode_value(v) for v in value]
+    elif isinstance(value, dict):
+        return {k: encode_value(v) for k, v in value.items()}
+    try:
+        return _json_encoder.default(value)
+    except TypeError:
+        return value
+
+
+def decode_value(value, language: str):
+    """model value dicts ({'model': .., 'pk': ..}) are resolved to their db obj.
+    """
+    if isinstance(value, dict) and 'model' in value and 'pk' in value:
+        return get_related_object(value)
+    return value
+
+
+def decode_primitive(value, language: str):
+    return value
+
+
+class PluginCodec:
+    def encode(self, instance, exporter) -> dict:
+        raise NotImplementedError
+
+    def decode(self, config: dict, language: str) -> dict:
+        return {k: decode_value(v, language) for k, v in config.items()}
+
+
+class PlusItemCodec(PluginCodec):
+    def encode(self, instance: PlusItem, exporter) -> dict:
+        # model values and internal links are resolved by the exporter (see PlaceholderMixin.resolve_plugin_refs)
+        return {'_json': instance.config}
+
+    def decode(self, config: dict, language: str) -> dict:
+        return config
+
+
+class TextCodec(PluginCodec):
+    def encode(self, instance: TextPlugin, exporter) -> dict:
+        return {
+            'body': instance.body,
+            'json': instance.json,
+            'rte': 'ckeditor4',
+        }
+
+
+class SerializeMethodCodec(PluginCodec):
+    """plugin models which have fields, which are not json - serializible may have a serialize method"""
+    def encode(self, instance, exporter) -> dict:
+        return instance.serialize()
+
+
+class FieldsCodec(PluginCodec):
+    """serializes the plugin form fields with value en-/decoders chosen once per field.
+    """
+    def __init__(self, fields: list[tuple[str, callable, callable]]):
+        self.fields = fields
+        self.decoders = {name: decoder for name, _, decoder in fields}
+
+    @classmethod
+    def for_plugin_class(cls, plugin_class) -> 'FieldsCodec':
+        fields = []
+        for name, form_field in plugin_class.form.base_fields.items():
+            if not hasattr(plugin_class.model, name):
+                continue
+            if isinstance(form_field, (forms.CharField, forms.IntegerField, forms.BooleanField, forms.FloatField)):
+                fields.append((name, encode_value, decode_primitive))
+            else:
+                fields.append((name, encode_value, decode_value))
+        return cls(fields)
+
+    def encode(self, instance, exporter) -> dict:
+        return {name: encoder(getattr(instance, name)) for name, encoder, _ in self.fields}
+
+    def decode(self, config: dict, language: str) -> dict:
+        return {k: self.decoders.get(k, decode_value)(v, language) for k, v in config.items()}
+
+
+class CustomCodec(PluginCodec):
+    """registered encoder and/or decoder, the built codec is used for the missing one.
+    """
+    def __init__(self, codec: PluginCodec, encoder=None, decoder=None):
+        self.codec = codec
+        self.encoder = encoder
+        self.decoder = decoder
+
+    def encode(self, instance, exporter) -> dict:
+        if self.encoder:
+            return self.encoder(instance, exporter)
+        return self.codec.encode(instance, exporter)
+
+    def decode(self, config: dict, language: str) -> dict:
+        if self.decoder:
+            return self.decoder(config, language)
+        return self.codec.decode(config, language)
+
+
+class CodecRegistry:
+    def __init__(self):
+        self.codecs = {}
+        self.custom = {}
+
+    def register(self, plugin_type: str, encoder=None, decoder=None):
+        """registers a custom encoder(instance, exporter) -> dict and/or decoder(config, language) -> dict for
+        plugin_type.
+        """
+        self.custom[plugin_type] = (encoder, decoder)
+        self.codecs.pop(plugin_type, None)
+
+    def fingerprint(self) -> str:
+        """codec version and registered custom codecs, part of the fragment cache keys (see exporters.py)
+        """
+        custom = sorted(
+            (plugin_type, *(getattr(f, '__qualname__', repr(f)) if f else '' for f in functions))
+            for plugin_type, functions in self.custom.items()
+        )
+        return f'{CODEC_VERSION}:{custom!r}'
+
+    def get(self, plugin_type: str) -> PluginCodec:
+        try:
+            return self.codecs[plugin_type]
+        except KeyError:
+            codec = self.codecs[plugin_type] = self.build_codec(plugin_type)
+            return codec
+
+    def build_codec(self, plugin_type: str) -> PluginCodec:
+        plugin_class = plugin_pool.get_plugin(plugin_type)
+        model = plugin_class.model
+
+        if issubclass(model, PlusItem):
+            codec = PlusItemCodec()
+        elif issubclass(model, TextPlugin):
+            codec = TextCodec()
+        elif hasattr(model, 'serialize'):
+            codec = SerializeMethodCodec()
+        else:
+            codec = FieldsCodec.for_plugin_class(plugin_class)
+
+        if plugin_type in self.custom:
+            encoder, decoder = self.custom[plugin_type]
+            codec = CustomCodec(codec, encoder=encoder, decoder=decoder)
+        return codec
+
+
+registry = CodecRegistry()
@@ -0,0 +1,286 @@
+"""Preflight of page, alias and placeholder imports: checks a transfer item against the target without writing anything.
+
+    plan = page_item.preflight()
+    plan.counts    # {'pages': 12, 'contents': 24, 'placeholders': 48, 'plugins': 310, 'model_refs': 18, 'links': 7}
+    plan.problems  # [Problem(kind='plugin_type', message='FooPlugin: unknown plugin type', fatal=True), ..]
+
+Fatal problems make the import fail (or write a partial tree), the others are reported by the import as well
+(e.g. missing model refs, unmatched slots). All db checks are set based: a few queries per model.
+"""
+from dataclasses import dataclass, field, asdict, replace
+from typing import Dict, Iterable, List
+
+from cms import constants
+from cms.models import Page, PageUrl
+from cms.plugin_pool import plugin_pool
+from cms.utils.conf import get_cms_setting
+from cms.utils.placeholder import get_placeholders
+from django.apps import apps
+from django.conf import settings
+from django.contrib.sites.models import Site
+from djangocms_alias.models import AliasContent
+
+from .instrumentation import instrumented, count
+from .refs import collect_model_values, find_pks, get_config, get_plugin_values, get_table_values, is_link
+
+BACKUP_PAGE_ID = 'error-404'
+
+
+@dataclass
+class Problem:
+    kind: str
+    message: str
+    fatal: bool = False
+
+
+@dataclass
+class Plan:
+    counts: Dict[str, int] = field(default_factory=dict)
+    problems: List[Problem] = field(default_factory=list)
+
+    @property
+    def fatal(self) -> List[Problem]:
+        return [p for p in self.problems if p.fatal]
+
+    @property
+    def warnings(self) -> List[Problem]:
+        return [p for p in self.problems if not p.fatal]
+
+    def add(self, kind: str, message: str, fatal=False):
+        problem = Problem(kind, message, fatal)
+        if problem not in self.problems:
+            self.problems.append(problem)
+
+    def asdict(self):
+        return asdict(self)
+
+
+@instrumented('preflight')
+def preflight(item, check_reverse_ids=True, site: Site = None, parent: Page = None) -> Plan:
+    """checks the page, alias or placeholder item: languages, plugin types, templates and slots, reverse ids on the
+    target site (if check_reverse_ids, default: the current site), model refs and internal link targets, which may
+    be pages created by the import below parent.
+    """
+    plan = Plan()
+    plugins = item.collect_plugins()
+    if item.type == 'page':
+        pages = item.collect_pages()
+        contents = [content for page in pages for content in page.page_contents]
+        plan.counts['pages'] = len(pages)
+    elif item.type == 'alias':
+        contents = item.alias_contents
+    if item.type == 'placeholder':
+        contents = []  # imported into the placeholder and language of the import
+        plan.counts['placeholders'] = 1
+    else:
+        plan.counts['contents'] = len(contents)
+        plan.counts['placeholders'] = sum(len(content.placeholders) for content in contents)
+    plan.counts['plugins'] = len(plugins)
+
+    check_languages(plan, contents)
+    check_plugin_types(plan, plugins)
+    if item.type == 'page':
+        check_templates(plan, pages)
+        if check_reverse_ids:
+            check_reverse_ids_exist(plan, pages, site)
+    elif item.type == 'alias':
+        check_alias_slots(plan, contents)
+    check_model_refs(plan, collect_model_values(item, plugins))
+    created = get_import_paths(item, parent) if item.type == 'page' else set()
+    check_links(plan, collect_links(item.refs, plugins), created)
+
+    count('problems', len(plan.problems))
+    return plan
+
+
+@instrumented('preflight')
+def preflight_units(units: Iterable, check_reverse_ids=True, site: Site = None, parent: Page = None) -> Plan:
+    """the preflight of an ndjson transfer (units of ndjson.iter_units, e.g. of a payload), unit by unit: only the
+    reverse ids, model refs and links are kept for the db checks at the end.
+    """
+    plan = Plan(counts={'contents': 0, 'placeholders': 0, 'plugins': 0})
+    refs = {}
+    pages = {}  # record id -> page item without contents
+    page_parents = {}  # record id of page -> record id of its parent page
+    page_paths = {None: get_parent_paths(parent)}  # record id of page -> language -> url path after the import
+    model_refs, links = [], []
+    slots = {}
+    for record, item in units:
+        if record['_parent'] is None:
+            refs = getattr(item, 'refs', None) or {}
+        if item.type == 'page':
+            pages[record['_id']] = item
+            page_parents[record['_id']] = record['_parent']
+            continue
+        if item.type == 'pagecontent':
+            base = page_paths.get(page_parents[record['_parent']], {})
+            page_paths.setdefault(record['_parent'], {})[item.language] = join_path(base, item)
+        if item.type == 'alias':
+            continue
+
+        plugins = item.collect_plugins()
+        plan.counts['contents'] += 1
+        plan.counts['placeholders'] += len(item.placeholders)
+        plan.counts['plugins'] += len(plugins)
+        check_languages(plan, [item])
+        check_plugin_types(plan, plugins)
+        if item.type == 'pagecontent':
+            check_templates(plan, [replace(pages[record['_parent']], page_contents=[item])], slots)
+        else:
+            check_alias_slots(plan, [item])
+        model_refs.extend(value for plugin in plugins for value in get_plugin_values(plugin))
+        links.extend(collect_links({}, plugins))
+
+    if pages:
+        plan.counts = {'pages': len(pages), **plan.counts}
+        if check_reverse_ids:
+            check_reverse_ids_exist(plan, list(pages.values()), site)
+    check_model_refs(plan, get_table_values(refs) + model_refs)
+    created = {path for record_id, paths in page_paths.items() if record_id is not None for path in paths.values()}
+    check_links(plan, collect_links(refs, []) + links, created)
+
+    count('problems', len(plan.problems))
+    return plan
+
+
+def check_languages(plan: Plan, contents: list):
+    languages = {code for code, _ in settings.LANGUAGES}
+    for language in sorted({content.language for content in contents} - languages):
+        plan.add('language', f'{language}: unknown language', fatal=True)
+
+
+def check_plugin_types(plan: Plan, plugins: list):
+    known = {plugin.__name__ for plugin in plugin_pool.get_all_plugins()}
+    for plugin_type in sorted({plugin.plugin_type for plugin in plugins} - known):
+        plan.add('plugin_type', f'{plugin_type}: unknown plugin type', fatal=True)
+
+
+def check_templates(plan: Plan, pages: list, slots: dict = None):
+    """slots (template -> declared slots) can be shared between calls
+    """
+    templates = {name for name, _ in get_cms_setting('TEMPLATES')}
+    slots = {} if slots is None else slots
+    for page in pages:
+        for content in page.page_contents:
+            template = content.template or page.template
+            if not template or template == constants.TEMPLATE_INHERITANCE_MAGIC:
+                continue
+            if template not in templates:
+                if template not in slots:
+                    plan.add('template', f'{template}: unknown template', fatal=True)
+                    slots[template] = None
+                continue
+            if template not in slots:
+                slots[template] = {placeholder.slot for placeholder in get_placeholders(template)}
+            for placeholder in content.placeholders:
+                if placeholder.slot not in slots[template]:
+                    plan.add('slot', f'{content.title} ({content.language}): slot {placeholder.slot} not in {template}')
+
+
+def check_alias_slots(plan: Plan, contents: list):
+    for content in contents:
+        for placeholder in content.placeholders:
+            if placeholder.slot != AliasContent.placeholder_slotname:
+                plan.add('slot', f'{content.name} ({content.language}): slot {placeholder.slot} not found')
+
+
+def check_reverse_ids_exist(plan: Plan, pages: list, site: Site = None):
+    """reverse ids are unique per site, like the importers check them
+    """
+    site = site or Site.objects.get_current()
+    reverse_ids = [page.reverse_id for page in pages if page.reverse_id]
+    existing = Page.objects.filter(reverse_id__in=reverse_ids, site=site).values_list('reverse_id', flat=True)
+    for reverse_id in existing:
+        plan.add('reverse_id', f'A page with the reverse_id="{reverse_id}" already exist.', fatal=True)
+
+
+# Model refs
+# ----------
+def check_model_refs(plan: Plan, refs: list[tuple[dict, str]]):
+    """finds the objects of refs like the import does (see refs.find_pks), with a few queries per model
+    """
+    plan.counts['model_refs'] = len(refs)
+    by_model = {}
+    for value, plugin_type in refs:
+        by_model.setdefault(value['model'], []).append((value, plugin_type))
+
+    for mdl_str, model_refs in by_model.items():
+        try:
+            apps.get_model(mdl_str)
+        except (LookupError, ValueError):
+            plan.add('model_ref', f'{mdl_str}: unknown model')
+            continue
+
+        batch = [(idx, value, plugin_type) for idx, (value, plugin_type) in enumerate(model_refs)]
+        for (value, _), pks in zip(model_refs, find_pks(batch)):
+            if not pks:
+                plan.add('model_ref', f'{value} not found.')
+
+
+# Links
+# -----
+def collect_links(refs: dict, plugins: list) -> list[str]:
+    """the internal links ('cms.page:/about/') of the ref table and of all plugin configs
+    """
+    links = [value for key, value in refs.items() if key.startswith('link:')]
+    for plugin in plugins:
+        links.extend(value['internal_link'] for value in get_config(plugin).values() if is_link(value))
+    return links
+
+
+def get_parent_paths(parent: Page = None) -> dict[str, str]:
+    """language -> url path of the parent page of an import ('' for the root)
+    """
+    if parent is None:
+        return {}
+    return dict(PageUrl.objects.filter(page=parent).values_list('language', 'path'))
+
+
+def join_path(base: dict[str, str], content) -> str:
+    return '/'.join(segment for segment in (base.get(content.language, ''), content.slug or '') if segment)
+
+
+def get_import_paths(page_item, parent: Page = None) -> set[str]:
+    """the url paths of the pages, which the import of page_item creates below parent. Links to them are resolved
+    after the import.
+    """
+    paths = set()
+
+    def walk(item, base: dict[str, str]):
+        item_paths = {content.language: join_path(base, content) for content in item.page_contents}
+        paths.update(item_paths.values())
+        for child in item.pages:
+            walk(child, item_paths)
+
+    walk(page_item, get_parent_paths(parent))
+    return paths
+
+
+def check_links(plan: Plan, links: list[str], created: set[str] = frozenset()):
+    """checks the page paths of absolute urls with one query, other links are not checked. Links to created paths
+    (pages created by the import) are resolved after the import.
+    """
+    plan.counts['links'] = len(links)
+    if not links:
+        return
+    if not Page.objects.filter(reverse_id=BACKUP_PAGE_ID).exists():
+        plan.add('backup_page', f'backup page with reverse_id: "{BACKUP_PAGE_ID}" not found!', fatal=True)
+
+    languages = {code for code, _ in settings.LANGUAGES}
+    paths = {}
+    for link in links:
+        mdl_str, abs_url = link.split(':', 1)
+        if mdl_str != 'cms.page' or not abs_url.startswith('/'):
+            continue
+        segments = abs_url.strip('/').split('/')
+        if segments[0] in languages:
+            segments = segments[1:]
+        paths[link] = '/'.join(segments)
+
+    missing = set(paths.values()) - created
+    found = set(created) | set(PageUrl.objects.filter(path__in=missing).values_list('path', flat=True))
+    if '' in paths.values() and Page.objects.filter(is_home=True).exists():
+        found.add('')  # the home page has the url of the language root
+    for link, path in paths.items():
+        if path not in found:
+            plan.add('link', f'{link}: link target not found, the backup page is linked.')
@@ -0,0 +1,276 @@
+"""Reference table of transfer items.
+
+Exports collect the distinct model refs and internal links of all plugin configs into the table `refs` of the
+top level item (page, alias, placeholder), the configs point to the table entries:
+
+    "refs": {"filer.image:58": {"model": "filer.image", "pk": 58, "sha1": "2e0e6..0"},
+             "link:cms.page:/about/": "cms.page:/about/"}
+    "config": {"_json": {"image": {"$ref": "filer.image:58"}, "link": {"internal_link": {"$ref": "link:cms.page:/about/"}}}}
+
+So every ref is resolved once on import (`update_model_refs`, `update_internal_links` of the item), the importers
+expand the entries when the plugins are built. Transfers without table (e.g. ndjson streams) keep their refs inline.
+
+The model refs are resolved in one batch per model. With `CONTENT_TRANSFER_REF_WORKERS > 1` the batches run in a
+thread pool (each thread with its own db connections), so refs to slow lookup backends (e.g. a shop database) are
+resolved concurrently; the results are merged in the order of the refs.
+"""
+import copy
+from concurrent.futures import ThreadPoolExecutor
+from queue import Empty, SimpleQueue
+
+from django.apps import apps
+from django.conf import settings
+from django.core.exceptions import FieldDoesNotExist
+from django.db import connections
+
+from .instrumentation import count
+
+REF = '$ref'
+ALIAS_PLUGIN = 'Alias'  # alias plugins look up their alias by name, see search_related_objects
+
+
+def get_config(plugin_item) -> dict:
+    """the plugin config holding the refs, PlusItems keep theirs in _json
+    """
+    config = plugin_item.config
+    return config if not '_json' in config else config.get('_json')
+
+
+def is_model_ref(value) -> bool:
+    return isinstance(value, dict) and 'model' in value
+
+
+def is_link(value) -> bool:
+    return isinstance(value, dict) and isinstance(value.get('internal_link'), str) and ':' in value['internal_link']
+
+
+def get_ref(value) -> str:
+    """the table key value points to or None
+    """
+    if isinstance(value, dict) and len(value) == 1 and REF in value:
+        return value[REF]
+    return None
+
+
+def model_ref_key(value: dict, plugin_type: str) -> str:
+    key = f"{value['model']}:{value.get('pk', value.get('p_keys'))}"
+    return f'{ALIAS_PLUGIN}@{key}' if plugin_type == ALIAS_PLUGIN else key
+
+
+def add_ref(refs: dict, key: str, value) -> dict:
+    """adds value to refs (a different value with the same key gets a numbered key) and returns a pointer to it
+    """
+    n = 1
+    unique_key = key
+    while unique_key in refs and refs[unique_key] != value:
+        n += 1
+        unique_key = f'{key}#{n}'
+    refs[unique_key] = value
+    return {REF: unique_key}
+
+
+def collect_refs(item) -> dict:
+    """moves the model refs and internal links of all plugin configs of item into item.refs.
+    """
+    for plugin_item in item.collect_plugins():
+        config = get_config(plugin_item)
+        for name, value in config.items():
+            if is_model_ref(value):
+                config[name] = add_ref(item.refs, model_ref_key(value, plugin_item.plugin_type), value)
+            elif is_link(value) and value['internal_link'].split(':', 1)[1]:
+                link = value['internal_link']
+                value['internal_link'] = add_ref(item.refs, f'link:{link}', link)
+    count('refs', len(item.refs))
+    return item.refs
+
+
+def expand(value, refs: dict):
+    """value with all pointers replaced by (copies of) their table entries
+    """
+    key = get_ref(value)
+    if key is not None:
+        return copy.deepcopy(refs[key])
+    if isinstance(value, dict):
+        return {k: expand(v, refs) for k, v in value.items()}
+    if isinstance(value, list):
+        return [expand(v, refs) for v in value]
+    return value
+
+
+def expand_config(plugin_item, refs: dict) -> dict:
+    return expand(plugin_item.config, refs) if refs else plugin_item.config
+
+
+def get_table_values(refs: dict) -> list[tuple[dict, str]]:
+    """(model ref, plugin type) of the model refs in the ref table
+    """
+    return [
+        (value, ALIAS_PLUGIN if key.startswith(f'{ALIAS_PLUGIN}@') else '')
+        for key, value in refs.items() if is_model_ref(value)
+    ]
+
+
+def get_plugin_values(plugin_item) -> list[tuple[dict, str]]:
+    """(model ref, plugin type) of the inline model refs in the config of plugin_item
+    """
+    return [(value, plugin_item.plugin_type) for value in get_config(plugin_item).values() if is_model_ref(value)]
+
+
+def collect_model_values(item, plugins: list = None) -> list[tuple[dict, str]]:
+    """(model ref, plugin type) of the ref table of item and of all its plugins (or of plugins if given)
+    """
+    values = get_table_values(getattr(item, 'refs', {}))
+    for plugin_item in item.collect_plugins() if plugins is None else plugins:
+        values.extend(get_plugin_values(plugin_item))
+    return values
+
+
+def resolve_model_values(values: list[tuple[dict, str]]) -> list[dict]:
+    """updates the pks of the model refs in values ((model ref, plugin type)), one batch per model, which is looked
+    up with a few set based queries (see find_pks).
+
+    With CONTENT_TRANSFER_REF_WORKERS > 1 the batches are resolved by a thread pool, the lookups run on copies and
+    the pks are written back in the order of values. Queries of the threads are not counted by TransferProfile.
+
+    Returns:
+        list[dict]: errors - model refs where no db obj can be found
+    """
+    count('model_refs', len(values))
+    batches = {}
+    for idx, (value, plugin_type) in enumerate(values):
+        batches.setdefault(value['model'], []).append((idx, value, plugin_type))
+
+    workers = min(getattr(settings, 'CONTENT_TRANSFER_REF_WORKERS', 1), len(batches))
+    if workers > 1:
+        queue = SimpleQueue()
+        for batch in batches.values():
+            queue.put(batch)
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='cmstransfer-refs') as executor:
+            results = list(executor.map(resolve_queue, [queue] * workers))
+    else:
+        results = [resolve_batch(batch) for batch in batches.values()]
+
+    resolved = sorted(entry for result in results for entry in result)
+    errors = []
+    for idx, updated, found in resolved:
+        value = values[idx][0]
+        value.update(updated)
+        if not found:
+            errors.append(value.copy())
+    return errors
+
+
+def resolve_queue(queue: SimpleQueue) -> list[tuple[int, dict, bool]]:
+    """resolves batches of queue until it is empty, runs in a pool thread with its own db connections.
+    """
+    result = []
+    try:
+        while True:
+            try:
+                batch = queue.get_nowait()
+            except Empty:
+                return result
+            result.extend(resolve_batch(batch))
+    finally:
+        # the thread's connections, one per thread and call, they aren't reused after the pool is shut down
+        connections.close_all()
+
+
+def resolve_batch(batch: list[tuple[int, dict, str]]) -> list[tuple[int, dict, bool]]:
+    """(index, updated copy, found) of the model refs in batch (all of the same model)
+    """
+    result = []
+    for (idx, value, plugin_type), pks in zip(batch, find_pks(batch)):
+        updated = dict(value)
+        if pks and 'pk' in updated:
+            updated['pk'] = pks[0]
+        elif pks:
+            updated['p_keys'] = pks
+        result.append((idx, updated, bool(pks)))
+    return result
+
+
+def find_pks(batch: list[tuple[int, dict, str]]) -> list[list]:
+    """the pks of the db objs of each model ref in batch, found like search_related_objects does, but with one
+    query per lookup field instead of one per ref:
+
+    - models with a lookup key (CONTENT_TRANSFER_LOOKUP_KEYS) by the lookup key
+    - aliases by their content name
+    - refs with p_keys by pks
+    - filer files (models with a sha1 field) by pk and sha1, then by sha1 only
+    - other refs by pk
+    """
+    mdl_str = batch[0][1]['model']
+    mdl = apps.get_model(mdl_str)
+    lookup_key = getattr(settings, 'CONTENT_TRANSFER_LOOKUP_KEYS', {}).get(mdl_str)
+    is_file = has_field(mdl, 'sha1')
+
+    by_key, by_name, existing, by_sha1 = {}, {}, {}, {}
+    if lookup_key:
+        by_key = get_pks_by(mdl, lookup_key, {value.get(lookup_key) for _, value, _ in batch})
+    else:
+        names = {value.get('name') for _, value, plugin_type in batch if plugin_type == ALIAS_PLUGIN}
+        by_name = get_pks_by(mdl, 'contents__name', names)
+
+        pks = set()
+        for _, value, plugin_type in batch:
+            if plugin_type != ALIAS_PLUGIN:
+                pks.update((value['p_keys'] or []) if 'p_keys' in value else [value.get('pk')])
+        pks.discard(None)
+        if pks:
+            # pk -> sha1 of filer files (pk -> pk otherwise)
+            existing = dict(mdl.objects.filter(pk__in=pks).values_list('pk', 'sha1' if is_file else 'pk'))
+
+        if is_file:
+            sha1s = {
+                value['sha1'] for _, value, plugin_type in batch
+                if plugin_type != ALIAS_PLUGIN and 'p_keys' not in value and 'sha1' in value
+                and existing.get(value.get('pk')) != value['sha1']
+            }
+            by_sha1 = get_pks_by(mdl, 'sha1', sha1s)
+
+    found = []
+    for _, value, plugin_type in batch:
+        if lookup_key:
+            found.append(by_key.get(value.get(lookup_key), []))
+        elif plugin_type == ALIAS_PLUGIN:
+            found.append(by_name.get(value.get('name'), []))
+        elif 'p_keys' in value:
+            found.append([pk for pk in value['p_keys'] or [] if pk in existing])
+        elif is_file and 'sha1' in value:
+            match = value.get('pk') in existing and existing[value['pk']] == value['sha1']
+            found.append([value['pk']] if match else by_sha1.get(value['sha1'], []))
+        else:
+            found.append([value['pk']] if value.get('pk') in existing else [])
+    return found
+
+
+def has_field(mdl, name: str) -> bool:
+    try:
+        mdl._meta.get_field(name)
+    except FieldDoesNotExist:
+        return False
+    return True
+
+
+def get_pks_by(mdl, field: str, values: set) -> dict:
+    """field value -> pks of the objs of mdl with field in values, with one query
+    """
+    values.discard(None)
+    if not values:
+        return {}
+    result = {}
+    for pk, value in mdl.objects.filter(**{f'{field}__in': values}).values_list('pk', field):
+        pks = result.setdefault(value, [])
+        if pk not in pks:
+            pks.append(pk)
+    return result
+
+
+def update_table_refs(refs: dict) -> list[dict]:
+    """updates the pks of all model refs in the table, each is resolved once.
+
+    Returns:
+        list[dict]: errors - model refs where no db obj can be found
+    """
+    return resolve_model_values(get_table_values(refs))
@@ -14,13 +14,13 @@ from django.utils.functional import Promise
 import logging
 logger = logging.getLogger(__name__)
 
-def get_related_object(value):
+def get_related_object(value, using=None):
     """
-    Returns the related field, referenced by the content of a ModelChoiceField.
+    Returns the related field, referenced by the content of a ModelChoiceField (read from database using if given).
     """
     try:
         Model = apps.get_model(value["model"])
-        relobj = Model.objects.get(pk=value["pk"])
+        relobj = Model.objects.using(using).get(pk=value["pk"])
     except (ObjectDoesNotExist, LookupError, TypeError):
         relobj = None
     return relobj
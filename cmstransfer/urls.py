@@ -0,0 +1,9 @@
+from django.urls import path
+
+from .views import export_view
+
+app_name = 'cmstransfer'
+
+urlpatterns = [
+    path('export/<str:model>/<int:pk>/', export_view, name='export'),
+]
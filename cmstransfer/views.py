@@ -0,0 +1,148 @@
+"""Pull based transfer: other instances fetch exports from here, see client.py.
+
+    GET <prefix>/export/page/<pk>/?recursive=1
+    GET <prefix>/export/alias/<pk>/
+    GET <prefix>/export/page/<pk>/?recursive=1&digest=1   only the merkle digest of the export (see digest.py)
+
+Requests are authenticated by the header `Authorization: Token <CONTENT_TRANSFER_TOKEN>` or a session of a superuser
+or a user with the add permission of the export model (PageExport, AliasExport). The ETag is derived from the
+change timestamps (and counts) of the exported pages, contents and plugins, so unchanged exports answer
+`304 Not Modified` without being exported. Gzip compressed responses have their own ETag.
+"""
+import hashlib
+
+from cms.models import Page, PageContent, Placeholder, CMSPlugin
+from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
+from django.core.exceptions import PermissionDenied
+from django.db import DEFAULT_DB_ALIAS
+from django.db.models import Count, Max
+from django.http import Http404, JsonResponse, StreamingHttpResponse
+from django.shortcuts import get_object_or_404
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.crypto import constant_time_compare
+from django.utils.http import quote_etag
+from django.utils.text import compress_sequence
+from django.views.decorators.http import require_GET
+from djangocms_alias.models import Alias, AliasContent
+
+from .exporters import PageExporter, AliasExporter
+from .serializers import JsonEncoder
+
+import logging
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 64 * 1024
+
+
+def get_database() -> str:
+    return getattr(settings, 'CONTENT_TRANSFER_EXPORT_DATABASE', DEFAULT_DB_ALIAS)
+
+
+def is_authorized(request, model: str) -> bool:
+    token = getattr(settings, 'CONTENT_TRANSFER_TOKEN', None)
+    auth = request.headers.get('Authorization', '')
+    if token and auth.startswith('Token '):
+        return constant_time_compare(auth[len('Token '):], token)
+    user = request.user
+    return user.is_active and (user.is_superuser or user.has_perm(f'cmstransfer.add_{model}export'))
+
+
+# ETags
+# -----
+def get_page_etag(page: Page, recursive: bool) -> str:
+    using = get_database()
+    pages = Page.objects.using(using).filter(pk=page.pk)
+    if recursive:
+        pages = Page.objects.using(using).filter(path__startswith=page.path, depth__gte=page.depth)
+    contents = PageContent.objects.using(using).filter(page__in=pages)
+    return get_etag(
+        ('page', page.pk, recursive),
+        pages.aggregate(Count('pk'), Max('changed_date')),
+        contents.aggregate(Count('pk'), Max('changed_date')),
+        get_plugin_stats(PageContent, contents),
+    )
+
+
+def get_alias_etag(alias: Alias) -> str:
+    using = get_database()
+    contents = AliasContent.objects.using(using).filter(alias=alias)
+    return get_etag(
+        ('alias', alias.pk),
+        list(contents.order_by('pk').values_list('pk', 'language', 'name')),
+        get_plugin_stats(AliasContent, contents),
+    )
+
+
+def get_plugin_stats(content_model, contents) -> dict:
+    using = get_database()
+    placeholders = Placeholder.objects.using(using).filter(
+        content_type=ContentType.objects.db_manager(using).get_for_model(content_model),
+        object_id__in=contents.values('pk'),
+    )
+    return CMSPlugin.objects.using(using).filter(placeholder__in=placeholders).aggregate(
+        Count('pk'), Max('changed_date')
+    )
+
+
+def get_etag(*parts) -> str:
+    return quote_etag(hashlib.sha1(repr(parts).encode()).hexdigest())
+
+
+# Export View
+# -----------
+@require_GET
+def export_view(request, model: str, pk: int):
+    if not is_authorized(request, model):
+        raise PermissionDenied
+
+    using = get_database()
+    if model == 'page':
+        page = get_object_or_404(Page.objects.using(using), pk=pk)
+        recursive = request.GET.get('recursive') in ('1', 'true')
+        etag = get_page_etag(page, recursive)
+        exporter = PageExporter(page, recursive=recursive, using=using)
+    elif model == 'alias':
+        alias = get_object_or_404(Alias.objects.using(using), pk=pk)
+        etag = get_alias_etag(alias)
+        exporter = AliasExporter(alias, using=using)
+    else:
+        raise Http404(f'unknown export model: {model}')
+
+    digest = request.GET.get('digest') in ('1', 'true')
+    compressed = not digest and 'gzip' in request.headers.get('Accept-Encoding', '')
+    if digest:
+        etag = get_etag(etag, 'digest')
+    elif compressed:
+        etag = get_etag(etag, 'gzip')  # the compressed body differs, so does its etag
+
+    response = get_conditional_response(request, etag=etag)
+    if response is None and digest:
+        response = JsonResponse(exporter.digest())
+    elif response is None:
+        # the export runs lazily, while the response is streamed
+        chunks = (chunk.encode() for chunk in export_chunks(exporter))
+        response = StreamingHttpResponse(content_type='application/json')
+        if compressed:
+            chunks = compress_sequence(chunks)
+            response.headers['Content-Encoding'] = 'gzip'
+        response.streaming_content = chunks
+
+    response.headers['ETag'] = etag
+    patch_vary_headers(response, ('Accept-Encoding', 'Authorization'))
+    return response
+
+
+def export_chunks(exporter):
+    """the json of the export in chunks of about CHUNK_SIZE
+    """
+    item = exporter.export()
+    logger.info(f'{item}: exported for pull')
+    buffer, size = [], 0
+    for chunk in JsonEncoder(ensure_ascii=False).iterencode(item.asdict()):
+        buffer.append(chunk)
+        size += len(chunk)
+        if size >= CHUNK_SIZE:
+            yield ''.join(buffer)
+            buffer, size = [], 0
+    yield ''.join(buffer)
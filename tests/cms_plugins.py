@@ -0,0 +1,13 @@
+from cms.plugin_base import CMSPluginBase
+from cms.plugin_pool import plugin_pool
+from cmsplus.models import PlusItem
+
+
+@plugin_pool.register_plugin
+class TestPlusPlugin(CMSPluginBase):
+    """Minimal PlusItem plugin for plugin configs with model refs and internal links.
+    """
+    model = PlusItem
+    name = 'Test Plus Item'
+    render_template = 'tests/plugin.html'
+    allow_children = True
@@ -0,0 +1,81 @@
+"""Django settings for the tests: in-memory SQLite, no network. The `export` database stands in for a read replica
+(see test_export_database.py).
+
+    python -m django test tests --settings=tests.settings
+"""
+import tempfile
+
+SECRET_KEY = 'cmstransfer-tests'
+DEBUG = False
+SITE_ID = 1
+USE_TZ = True
+ROOT_URLCONF = 'tests.urls'
+DEFAULT_AUTO_FIELD = 'django.db.models.AutoField'
+ALLOWED_HOSTS = ['testserver']
+
+INSTALLED_APPS = [
+    'django.contrib.auth',
+    'django.contrib.contenttypes',
+    'django.contrib.sessions',
+    'django.contrib.admin',
+    'django.contrib.messages',
+    'django.contrib.sites',
+    'cms',
+    'menus',
+    'treebeard',
+    'sekizai',
+    'parler',
+    'filer',
+    'easy_thumbnails',
+    'djangocms_text',
+    'djangocms_alias',
+    'cmsplus',
+    'cmstransfer',
+    'tests',
+]
+
+DATABASES = {
+    'default': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': ':memory:',
+    },
+    'export': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': ':memory:',
+    },
+}
+
+MIDDLEWARE = [
+    'django.contrib.sessions.middleware.SessionMiddleware',
+    'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'django.contrib.messages.middleware.MessageMiddleware',
+]
+
+TEMPLATES = [{
+    'BACKEND': 'django.template.backends.django.DjangoTemplates',
+    'DIRS': [],
+    'APP_DIRS': True,
+    'OPTIONS': {
+        'context_processors': [
+            'django.template.context_processors.request',
+            'django.contrib.auth.context_processors.auth',
+            'django.contrib.messages.context_processors.messages',
+            'sekizai.context_processors.sekizai',
+            'cms.context_processors.cms_settings',
+        ],
+    },
+}]
+
+LANGUAGE_CODE = 'de'
+LANGUAGES = [
+    ('de', 'Deutsch'),
+    ('en', 'English'),
+]
+
+CMS_TEMPLATES = [('tests/page.html', 'Test Page')]
+CMS_CONFIRM_VERSION4 = True
+
+MEDIA_ROOT = tempfile.mkdtemp(prefix='cmstransfer-tests-')
+MEDIA_URL = '/media/'
+
+CONTENT_TRANSFER_TOKEN = 'secret'
@@ -0,0 +1,13 @@
+from django.test import SimpleTestCase
+
+from cmstransfer.bundle import is_file_ref
+
+
+class FileRefTest(SimpleTestCase):
+    def test_is_file_ref(self):
+        self.assertTrue(is_file_ref({'model': 'filer.file', 'pk': 1}))
+        self.assertTrue(is_file_ref({'model': 'filer.image', 'pk': 1}))
+        # folders and unknown models are plain model refs, not bundled
+        self.assertFalse(is_file_ref({'model': 'filer.folder', 'pk': 1}))
+        self.assertFalse(is_file_ref({'model': 'filer.unknown', 'pk': 1}))
+        self.assertFalse(is_file_ref({'model': 'filer.file'}))
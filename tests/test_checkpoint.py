@@ -0,0 +1,41 @@
+from cms.api import create_page
+from cms.models import Page
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+
+from cmstransfer.exporters import PageExporter
+from cmstransfer.importers import PageImporter
+
+
+@override_settings(CONTENT_TRANSFER_CHECKPOINT_PAGES=1)  # page by page
+class CheckpointTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_superuser('admin', 'admin@example.com', 'pw')
+        home = create_page('Home', 'tests/page.html', 'de', created_by=cls.user)
+        for title in ('A', 'B'):
+            create_page(title, 'tests/page.html', 'de', created_by=cls.user, parent=home)
+        cls.home_pk = home.pk  # pages can't be deep copied (admin content cache)
+
+    def test_failed_checkpoint_rolls_back_chunk(self):
+        home = Page.objects.get(pk=self.home_pk)
+        page_item = PageExporter(home, recursive=True).export()
+        n_pages = Page.objects.count()
+
+        def fail_second_checkpoint(checkpoint):
+            # the process dies after the second chunk is imported, before its checkpoint is written
+            if len(checkpoint['pages']) == 2:
+                raise RuntimeError('killed')
+
+        checkpoint = {}
+        importer = PageImporter(page_item, self.user, parent=home, checkpoint=checkpoint,
+                                on_checkpoint=fail_second_checkpoint)
+        with self.assertRaises(RuntimeError):
+            importer.exec_import()
+        self.assertEqual(list(checkpoint['pages']), ['0'])
+        self.assertEqual(Page.objects.count(), n_pages + 1)
+
+        # resume imports the rolled back chunk once
+        PageImporter(page_item, self.user, parent=home, checkpoint=checkpoint).exec_import()
+        self.assertEqual(Page.objects.count(), n_pages + 3)
+        self.assertEqual(checkpoint, {})
@@ -0,0 +1,45 @@
+from cms.api import add_plugin, create_page
+from cms.models import CMSPlugin, Page, PageContent, PageUrl, Placeholder
+from django.contrib.auth.models import User
+from django.core import serializers
+from django.db import connections
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from djangocms_text.models import Text
+
+from cmstransfer.exporters import PageExporter
+
+# models of the test pages, in dependency order
+REPLICATED_MODELS = (Page, PageContent, PageUrl, Placeholder, CMSPlugin, Text)
+
+
+class ExportDatabaseTest(TestCase):
+    databases = {'default', 'export'}
+
+    @classmethod
+    def setUpTestData(cls):
+        user = User.objects.create_superuser('admin', 'admin@example.com', 'pw')
+        home = create_page('Home', 'tests/page.html', 'de', created_by=user)
+        child = create_page('Child', 'tests/page.html', 'de', created_by=user, parent=home)
+        for page in (home, child):
+            placeholder = page.get_admin_content('de').get_placeholders().get(slot='content')
+            add_plugin(placeholder, 'TextPlugin', 'de', body=f'<p>{page.get_title("de")}</p>')
+        cls.page_pk = home.pk  # pages can't be deep copied (admin content cache)
+
+        # replicate the pages into the export database, content types by natural key (their ids differ)
+        for model in REPLICATED_MODELS:
+            data = serializers.serialize('json', model.objects.all(), use_natural_foreign_keys=True)
+            for obj in serializers.deserialize('json', data, using='export'):
+                obj.save(using='export')
+
+    def test_export_from_secondary_alias(self):
+        page = Page.objects.using('export').get(pk=self.page_pk)
+        with CaptureQueriesContext(connections['default']) as default_queries:
+            with CaptureQueriesContext(connections['export']) as export_queries:
+                item = PageExporter(page, recursive=True, using='export').export()
+
+        self.assertEqual(len(default_queries), 0, [q['sql'] for q in default_queries])
+        self.assertGreater(len(export_queries), 0)
+        self.assertEqual(len(item.pages), 1)
+        plugins = item.pages[0].page_contents[0].placeholders[0].plugins
+        self.assertEqual(plugins[0].config['body'], '<p>Child</p>')
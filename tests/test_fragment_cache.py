@@ -0,0 +1,40 @@
+from cms.api import add_plugin, create_page
+from cms.models import Page
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+
+from cmstransfer.exporters import PageExporter
+from cmstransfer.instrumentation import TransferProfile
+
+CACHES = {
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+    'cmstransfer': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'fragments'},
+}
+
+
+@override_settings(CACHES=CACHES, CONTENT_TRANSFER_FRAGMENT_CACHE='cmstransfer')
+class FragmentCacheTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        user = User.objects.create_superuser('admin', 'admin@example.com', 'pw')
+        home = create_page('Home', 'tests/page.html', 'de', created_by=user)
+        target = create_page('Target', 'tests/page.html', 'de', created_by=user, parent=home)
+        create_page('Other', 'tests/page.html', 'de', created_by=user, parent=home)
+        placeholder = home.get_admin_content('de').get_placeholders().get(slot='content')
+        add_plugin(placeholder, 'TestPlusPlugin', 'de', _json={'link': {'internal_link': f'cms.page:{target.pk}'}})
+        cls.home_pk, cls.target_pk = home.pk, target.pk  # pages can't be deep copied (admin content cache)
+
+    def export_links(self):
+        with TransferProfile(trace_memory=False).activate() as profile:
+            item = PageExporter(Page.objects.get(pk=self.home_pk)).export()
+        cached = profile.asdict()['build_placeholder_item']['objects'].get('cached_placeholders', 0)
+        return [key for key in item.refs if key.startswith('link:')], cached
+
+    def test_links_resolved_after_cache(self):
+        self.assertEqual(self.export_links(), (['link:cms.page:/home/target/'], 0))
+        self.assertEqual(self.export_links(), (['link:cms.page:/home/target/'], 1))
+
+        # moving the linked page doesn't change the plugins of the cached placeholder
+        target = Page.objects.get(pk=self.target_pk)
+        target.move_page(Page.objects.get(reverse_id=None, pagecontent_set__title='Other'), 'last-child')
+        self.assertEqual(self.export_links(), (['link:cms.page:/home/other/target/'], 1))
@@ -0,0 +1,59 @@
+from cms.api import create_page
+from cms.models import Page
+from django.contrib.auth.models import User
+from django.test import TestCase
+
+from cmstransfer.items import PageItem, PlaceholderItem
+from cmstransfer.ndjson import item_to_records, iter_units
+from cmstransfer.preflight import preflight_units
+
+
+def page_data(title: str, pages: list = (), plugins: list = ()) -> dict:
+    content = {'type': 'pagecontent', 'language': 'de', 'title': title, 'slug': title.lower(),
+               'placeholders': [{'type': 'placeholder', 'slot': 'content', 'plugins': list(plugins)}]}
+    return {'type': 'page', 'page_id': 0, 'template': 'tests/page.html', 'page_contents': [content],
+            'pages': list(pages)}
+
+
+def link_plugin(link: str) -> dict:
+    return {'type': 'plugin', 'plugin_type': 'TestPlusPlugin', 'config': {'_json': {'link': {'internal_link': link}}}}
+
+
+class PreflightLinkTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        user = User.objects.create_superuser('admin', 'admin@example.com', 'pw')
+        cls.parent_pk = create_page('Home', 'tests/page.html', 'de', created_by=user).pk
+        cls.data = page_data('New', pages=[page_data('Child', plugins=[
+            link_plugin('cms.page:/new/child/'),  # page of the transfer
+            link_plugin('cms.page:/home/'),  # existing page
+            link_plugin('cms.page:/missing/'),
+        ])])
+
+    def link_problems(self, plan) -> list[str]:
+        return [problem.message.split(':', 2)[1] for problem in plan.problems if problem.kind == 'link']
+
+    def test_links_to_created_pages(self):
+        plan = PageItem.from_dict(self.data).preflight()
+        self.assertEqual(self.link_problems(plan), ['/missing/'])
+
+        # below home the transfer creates /home/new/child/
+        plan = PageItem.from_dict(self.data).preflight(parent=Page.objects.get(pk=self.parent_pk))
+        self.assertEqual(self.link_problems(plan), ['/new/child/', '/missing/'])
+
+    def test_links_to_created_pages_stream(self):
+        units = iter_units(item_to_records(PageItem.from_dict(self.data)))
+        self.assertEqual(self.link_problems(preflight_units(units)), ['/missing/'])
+
+
+class PlaceholderPreflightTest(TestCase):
+    def test_placeholder(self):
+        item = PlaceholderItem.from_dict({'type': 'placeholder', 'slot': 'content', 'plugins': [
+            {'type': 'plugin', 'plugin_type': 'FooPlugin', 'config': {}},
+            {'type': 'plugin', 'plugin_type': 'TestPlusPlugin', 'config': {'_json': {
+                'folder': {'model': 'filer.folder', 'pk': 1},
+            }}},
+        ]})
+        plan = item.preflight()
+        self.assertEqual(plan.counts, {'placeholders': 1, 'plugins': 2, 'model_refs': 1, 'links': 0})
+        self.assertEqual([(p.kind, p.fatal) for p in plan.problems], [('plugin_type', True), ('model_ref', False)])
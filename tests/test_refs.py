@@ -0,0 +1,48 @@
+from django.test import SimpleTestCase, TestCase
+from filer.models import Folder
+
+from cmstransfer.items import PageItem
+from cmstransfer.ndjson import item_to_records, records_to_item
+from cmstransfer.preflight import Plan, check_model_refs
+from cmstransfer.refs import resolve_model_values
+
+
+class ModelRefTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.folder = Folder.objects.create(name='images')
+
+    def test_folder_ref(self):
+        # filer models without a sha1 field are looked up by pk
+        found = {'model': 'filer.folder', 'pk': self.folder.pk}
+        missing = {'model': 'filer.folder', 'pk': self.folder.pk + 1}
+        errors = resolve_model_values([(found, ''), (missing, '')])
+        self.assertEqual(found['pk'], self.folder.pk)
+        self.assertEqual(errors, [missing])
+
+    def test_folder_ref_preflight(self):
+        plan = Plan()
+        check_model_refs(plan, [({'model': 'filer.folder', 'pk': self.folder.pk}, ''),
+                                ({'model': 'filer.folder', 'pk': self.folder.pk + 1}, '')])
+        self.assertEqual([p.kind for p in plan.problems], ['model_ref'])
+
+
+class ItemRefsTest(SimpleTestCase):
+    def test_refs_only_on_top_level_item(self):
+        item = PageItem.from_dict({'type': 'page', 'page_id': 1, 'refs': {'link:1': 'cms.page:/'}, 'page_contents': [
+            {'type': 'pagecontent', 'language': 'de', 'placeholders': [{'type': 'placeholder', 'slot': 'content'}]},
+        ]})
+        placeholder = item.page_contents[0].placeholders[0]
+        self.assertEqual(placeholder.refs, {})  # default of the missing table
+
+        data = item.asdict()
+        self.assertEqual(data['refs'], {'link:1': 'cms.page:/'})
+        self.assertNotIn('refs', data['page_contents'][0]['placeholders'][0])
+
+    def test_refs_only_on_top_level_record(self):
+        item = PageItem.from_dict({'type': 'page', 'page_id': 1, 'refs': {'link:1': 'cms.page:/'}, 'page_contents': [
+            {'type': 'pagecontent', 'language': 'de', 'placeholders': [{'type': 'placeholder', 'slot': 'content'}]},
+        ]})
+        records = list(item_to_records(item))
+        self.assertEqual([record['type'] for record in records if 'refs' in record], ['page'])
+        self.assertEqual(records_to_item(records).asdict(), item.asdict())
@@ -0,0 +1,66 @@
+import gzip
+import json
+
+from cms.api import add_plugin, create_page
+from django.contrib.auth.models import Permission, User
+from django.test import TestCase
+
+from cmstransfer.client import TransferClient, django_client_transport
+
+
+class ExportViewTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.superuser = User.objects.create_superuser('admin', 'admin@example.com', 'pw')
+        page = create_page('Home', 'tests/page.html', 'de', created_by=cls.superuser)
+        placeholder = page.get_admin_content('de').get_placeholders().get(slot='content')
+        cls.plugin = add_plugin(placeholder, 'TextPlugin', 'de', body='<p>hello</p>')
+        cls.page_pk = page.pk  # pages can't be deep copied (admin content cache)
+        cls.url = f'/transfer/export/page/{page.pk}/'
+
+    def get(self, url=None, **headers):
+        return self.client.get(url or self.url, headers={'Authorization': 'Token secret', **headers})
+
+    def test_export(self):
+        response = self.get()
+        self.assertEqual(response.status_code, 200)
+        data = json.loads(b''.join(response.streaming_content))
+        self.assertEqual(data['type'], 'page')
+        self.assertEqual(data['page_contents'][0]['placeholders'][0]['plugins'][0]['plugin_type'], 'TextPlugin')
+        self.assertIn('Accept-Encoding', response['Vary'])
+
+    def test_not_modified(self):
+        etag = self.get()['ETag']
+        response = self.get(**{'If-None-Match': etag})
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+
+        self.plugin.save()  # changes changed_date
+        self.assertEqual(self.get(**{'If-None-Match': etag}).status_code, 200)
+
+    def test_gzip(self):
+        response = self.get(**{'Accept-Encoding': 'gzip'})
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        data = json.loads(gzip.decompress(b''.join(response.streaming_content)))
+        self.assertEqual(data['type'], 'page')
+        # the compressed body has its own etag
+        self.assertNotEqual(response['ETag'], self.get()['ETag'])
+        self.assertEqual(self.get(**{'Accept-Encoding': 'gzip', 'If-None-Match': response['ETag']}).status_code, 304)
+
+    def test_forbidden(self):
+        self.assertEqual(self.client.get(self.url).status_code, 403)
+        self.assertEqual(self.get(Authorization='Token wrong').status_code, 403)
+
+        staff = User.objects.create_user('staff', 'staff@example.com', 'pw', is_staff=True)
+        self.client.force_login(staff)
+        self.assertEqual(self.client.get(self.url).status_code, 403)
+
+        staff.user_permissions.add(Permission.objects.get(codename='add_pageexport'))
+        self.client.force_login(User.objects.get(pk=staff.pk))
+        self.assertEqual(self.client.get(self.url).status_code, 200)
+
+    def test_client(self):
+        client = TransferClient('/transfer/', token='secret', transport=django_client_transport(self.client))
+        page_import, etag = client.pull_page(self.page_pk)
+        self.assertEqual(page_import.data['type'], 'page')
+        self.assertEqual(client.pull_page(self.page_pk, etag=etag), (None, etag))
@@ -0,0 +1,6 @@
+from django.urls import include, path
+
+urlpatterns = [
+    path('transfer/', include('cmstransfer.urls')),
+    path('', include('cms.urls')),
+]